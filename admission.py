@@ -0,0 +1,189 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from metrics import ADMISSION_DECISIONS
+
+FALLBACK = 'fallback'
+REJECT = 'reject'
+OVERFLOW_MODES = (FALLBACK, REJECT)
+
+
+class RateLimiter:
+    """Token bucket per client
+
+    Each client may send ``burst`` requests at once and ``rate`` requests
+    per second after that. Buckets of clients not seen for a while are
+    dropped once more than ``max_clients`` are tracked; a dropped client
+    simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.limited = 0
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client, cost=1):
+        """Take ``cost`` tokens; returns 0 when allowed, else seconds until they are free
+
+        A cost above ``burst`` is charged as a full bucket.
+        """
+        cost = min(cost, self.burst)
+        with self._lock:
+            now = self._clock()
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / self.rate
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'clients': len(self._buckets),
+                'limited': self.limited,
+            }
+
+
+class AdmissionController:
+    """Bounds the chat requests working on answers at once
+
+    Up to ``max_in_flight`` requests run; up to ``max_queue`` more wait at
+    most ``queue_timeout`` seconds for a slot. Everything beyond that is
+    overflow, which the caller answers according to ``overflow``: with the
+    knowledge base (``'fallback'``) or with a 429 (``'reject'``). Either way
+    it never waits on the model, so latency stays bounded under overload.
+    """
+
+    def __init__(self, max_in_flight=32, max_queue=64, queue_timeout=1.0, overflow=FALLBACK):
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_MODES}, not {overflow!r}")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.overflow = overflow
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        # Smoothed seconds an admitted request holds its slot
+        self.service_time = 0.0
+        self._ready = threading.Condition()
+
+    @contextmanager
+    def admit(self):
+        """Yield True with a slot held for the block, or False for overflow"""
+        if not self.acquire():
+            yield False
+            return
+        start = time.monotonic()
+        try:
+            yield True
+        finally:
+            self.release(time.monotonic() - start)
+
+    def retry_after(self):
+        """Whole seconds until the current backlog has likely cleared (at least 1)"""
+        with self._ready:
+            backlog = (self.in_flight + self.queued) / max(1, self.max_in_flight)
+            return max(1, math.ceil(backlog * self.service_time))
+
+    def stats(self):
+        with self._ready:
+            return {
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'overflow': self.overflow,
+                'service_time': round(self.service_time, 4),
+            }
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room; False for overflow
+
+        Every True must be followed by ``release``; ``admit`` does both for a block.
+        """
+        with self._ready:
+            if self.in_flight < self.max_in_flight:
+                return self._take('admitted')
+            if self.queued >= self.max_queue:
+                return self._overflow()
+            self.queued += 1
+            try:
+                free = self._ready.wait_for(lambda: self.in_flight < self.max_in_flight, self.queue_timeout)
+            finally:
+                self.queued -= 1
+            return self._take('queued') if free else self._overflow()
+
+    def release(self, elapsed):
+        """Free a slot held for ``elapsed`` seconds"""
+        with self._ready:
+            self.in_flight -= 1
+            self.service_time = elapsed if not self.service_time else 0.9 * self.service_time + 0.1 * elapsed
+            self._ready.notify()
+
+    def _take(self, decision):
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_DECISIONS.inc(decision)
+        return True
+
+    def _overflow(self):
+        self.shed += 1
+        ADMISSION_DECISIONS.inc(self.overflow)
+        return False
+
+
+def create_rate_limiter():
+    """Build the per-client rate limiter configured through environment variables
+
+    CHATBOT_RATE_LIMIT: requests per second per client; off when unset or 0
+    CHATBOT_RATE_BURST: requests a client may send at once (default 10)
+    CHATBOT_RATE_CLIENTS: clients tracked before the least recent is forgotten (default 10000)
+    """
+    rate = float(os.getenv('CHATBOT_RATE_LIMIT', '0'))
+    if rate <= 0:
+        return None
+    return RateLimiter(
+        rate,
+        burst=float(os.getenv('CHATBOT_RATE_BURST', '10')),
+        max_clients=int(os.getenv('CHATBOT_RATE_CLIENTS', '10000')),
+    )
+
+
+def create_admission_controller():
+    """Build the admission controller configured through environment variables
+
+    CHATBOT_ADMISSION: 'on' (default) or 'off'
+    CHATBOT_MAX_IN_FLIGHT: chat requests answered at once (default 32)
+    CHATBOT_MAX_QUEUE: requests allowed to wait for a slot (default 64)
+    CHATBOT_QUEUE_TIMEOUT: seconds a request waits for a slot (default 1)
+    CHATBOT_OVERLOAD: 'fallback' answers overflow from the knowledge base (default), 'reject' returns 429
+    """
+    if os.getenv('CHATBOT_ADMISSION', 'on').lower() == 'off':
+        return None
+    return AdmissionController(
+        max_in_flight=int(os.getenv('CHATBOT_MAX_IN_FLIGHT', '32')),
+        max_queue=int(os.getenv('CHATBOT_MAX_QUEUE', '64')),
+        queue_timeout=float(os.getenv('CHATBOT_QUEUE_TIMEOUT', '1')),
+        overflow=os.getenv('CHATBOT_OVERLOAD', FALLBACK).lower(),
+    )
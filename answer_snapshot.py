@@ -0,0 +1,175 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+# File layout: header, index entries sorted by key hash, then one blob of
+# UTF-8 keys and answers that the entries point into
+MAGIC = b'CBSNAP01'
+HEADER = struct.Struct('<8sI4x')
+# key hash, key offset, key length, answer offset, answer length (offsets into the blob)
+ENTRY = struct.Struct('<QIIII')
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def write_snapshot(path, answers):
+    """Write a {key: answer} dict as a snapshot file, replacing any old one atomically"""
+    entries = []
+    blob = bytearray()
+    for key, answer in answers.items():
+        key, answer = key.encode('utf-8'), answer.encode('utf-8')
+        entries.append((key_hash(key), len(blob), len(key), len(blob) + len(key), len(answer)))
+        blob += key
+        blob += answer
+    if len(blob) > 0xFFFFFFFF:
+        raise ValueError('Snapshot blob exceeds 4 GiB')
+    entries.sort()
+
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(entries)))
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        # Readers that mapped the old file keep it until they reopen
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(entries)
+
+
+class _Mapping:
+    """One opened snapshot file"""
+
+    __slots__ = ('data', 'count', 'blob_start', 'identity')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            # mmap refuses empty files; a valid snapshot is never empty anyway
+            if st.st_size < HEADER.size:
+                raise ValueError(f'{path} is not an answer snapshot')
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        self.blob_start = HEADER.size + self.count * ENTRY.size
+        if magic != MAGIC or self.blob_start > len(self.data):
+            raise ValueError(f'{path} is not an answer snapshot')
+        self.identity = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def get(self, key):
+        """Binary search the index for the key's hash, then compare the key itself"""
+        wanted = key_hash(key)
+        data = self.data
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ENTRY.unpack_from(data, HEADER.size + mid * ENTRY.size)[0] < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Walk the (rare) run of entries sharing this hash
+        for i in range(lo, self.count):
+            entry_hash, key_offset, key_length, offset, length = ENTRY.unpack_from(data, HEADER.size + i * ENTRY.size)
+            if entry_hash != wanted:
+                break
+            start = self.blob_start + key_offset
+            if data[start:start + key_length] == key:
+                start = self.blob_start + offset
+                return data[start:start + length].decode('utf-8')
+        return None
+
+
+class AnswerSnapshot:
+    """Read-only precomputed answers served from a memory-mapped file
+
+    The file is mapped, not read, so the operating system shares its pages
+    between worker processes and loads only the parts that are looked up.
+    Every ``check_interval`` seconds the file is checked; a rebuilt file
+    (swapped in by ``write_snapshot``) is mapped in its place. Lookups that
+    already hold the old mapping finish on it. A missing file is not an
+    error: nothing is answered until it appears.
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._mapping = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._reload_if_changed()
+
+    def __len__(self):
+        mapping = self._mapping
+        return mapping.count if mapping else 0
+
+    def get(self, key):
+        """Precomputed answer for a response cache key, or None"""
+        if self.check_interval > 0:
+            self._reload_if_changed()
+        mapping = self._mapping
+        answer = mapping.get(key.encode('utf-8')) if mapping else None
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def after_fork(self):
+        """Reset per-process state; the mapping itself is shared across fork"""
+        self._lock = threading.Lock()
+
+    def stats(self):
+        mapping = self._mapping
+        return {
+            'path': self.path,
+            'entries': mapping.count if mapping else 0,
+            'bytes': len(mapping.data) if mapping else 0,
+            'loads': self.loads,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_interval
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._mapping = None
+                return
+            current = self._mapping
+            if current is None or current.identity != (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size):
+                self._mapping = _Mapping(self.path)
+                self.loads += 1
+        except Exception as e:
+            print(f"Answer Snapshot Error: {e}")
+        finally:
+            self._lock.release()
+
+
+def create_answer_snapshot():
+    """Open the answer snapshot configured through environment variables
+
+    CHATBOT_SNAPSHOT_PATH: snapshot file written by precompute.py; off when unset
+    CHATBOT_SNAPSHOT_CHECK_INTERVAL: seconds between checks for a rebuilt file (default 2; 0 disables)
+    """
+    path = os.getenv('CHATBOT_SNAPSHOT_PATH')
+    if not path:
+        return None
+    return AnswerSnapshot(path, check_interval=float(os.getenv('CHATBOT_SNAPSHOT_CHECK_INTERVAL', '2')))
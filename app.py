@@ -1,39 +1,283 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+import atexit
+import hmac
 import json
+import math
 import os
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
+from admission import REJECT, create_admission_controller, create_rate_limiter
 from chatbot_engine import ChatbotEngine
+from circuit_breaker import STATE_VALUES
+from conversation_log import create_conversation_logger
+from static_assets import create_static_assets
+from metrics import ADMISSION_DECISIONS, REGISTRY, REQUEST_SECONDS, STAGE_SECONDS
 
-app = Flask(__name__, static_folder='.', static_url_path='')
+# Front-end files are served from memory by the static asset pipeline, so
+# nothing else in the project directory (.env included) is reachable
+app = Flask(__name__, static_folder=None)
 CORS(app)
+static_assets = create_static_assets()
 
 # Initialize chatbot engine
 chatbot = ChatbotEngine()
 
+# Per-client request rate limit, and a cap on chat requests answered at once
+# so a burst is shed to the knowledge base instead of queueing on the model
+rate_limiter = create_rate_limiter()
+admission = create_admission_controller()
+
+# Answered messages are appended to a JSONL file when CHATBOT_LOG_PATH is set
+conversation_log = create_conversation_logger()
+if conversation_log:
+    # Write what is still queued when the process exits
+    atexit.register(conversation_log.close)
+
+# Largest number of messages accepted by /api/chat/batch
+MAX_BATCH_SIZE = 100
+
+# Token required by admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.getenv('CHATBOT_ADMIN_TOKEN')
+
+# Set when the worker is shutting down so load balancers stop routing to it
+draining = threading.Event()
+
+# Cache and session gauges are read from the engine at scrape time
+REGISTRY.gauge(
+    'chatbot_cache_events', 'Response cache lookups and evictions by outcome',
+    lambda: {(key,): value for key, value in chatbot.response_cache.stats().items()
+             if key in ('hits', 'misses', 'evictions', 'expirations')} if chatbot.response_cache else {},
+    labels=('event',)
+)
+REGISTRY.gauge(
+    'chatbot_cache_entries', 'Entries in the response cache',
+    lambda: chatbot.response_cache.stats()['size'] if chatbot.response_cache else None
+)
+REGISTRY.gauge(
+    'chatbot_snapshot_entries', 'Precomputed answers in the mapped answer snapshot',
+    lambda: len(chatbot.answer_snapshot) if chatbot.answer_snapshot is not None else None
+)
+REGISTRY.gauge(
+    'chatbot_sessions', 'Conversations held in the session store',
+    lambda: len(chatbot.session_store) if chatbot.session_store else None
+)
+REGISTRY.gauge(
+    'chatbot_session_bytes', 'Estimated memory used by the session store',
+    lambda: chatbot.session_store.size if chatbot.session_store else None
+)
+REGISTRY.gauge(
+    'chatbot_coalesced_waiting', 'Requests currently waiting on an identical in-flight model call',
+    lambda: chatbot.single_flight.stats()['waiting'] if chatbot.single_flight else None
+)
+REGISTRY.gauge(
+    'chatbot_conversation_log_dropped', 'Conversation log records dropped because the writer fell behind',
+    lambda: conversation_log.dropped if conversation_log else None
+)
+REGISTRY.gauge(
+    'chatbot_chat_in_flight', 'Chat requests currently being answered',
+    lambda: admission.stats()['in_flight'] if admission else None
+)
+REGISTRY.gauge(
+    'chatbot_chat_queued', 'Chat requests waiting for an admission slot',
+    lambda: admission.stats()['queued'] if admission else None
+)
+REGISTRY.gauge(
+    'chatbot_circuit_state', 'Model circuit breaker state (0 closed, 1 open, 2 half-open)',
+    lambda: STATE_VALUES[chatbot.circuit_breaker.state] if chatbot.circuit_breaker else None
+)
+REGISTRY.gauge(
+    'chatbot_circuit_rejected', 'Model calls skipped because the circuit breaker was open',
+    lambda: chatbot.circuit_breaker.rejected if chatbot.circuit_breaker else None
+)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    """Record request latency per route (streams are timed to the first byte)"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, str(response.status_code))
+    return response
+
 @app.route('/')
 def home():
     """Serve index.html"""
-    return send_from_directory('.', 'index.html')
+    return _serve_asset(static_assets.entry_point)
+
+@app.route('/<path:filename>', methods=['GET'])
+def asset(filename):
+    """Serve an allow-listed front-end file, precompressed and fingerprinted"""
+    return _serve_asset(filename)
+
+def _serve_asset(name):
+    result = static_assets.respond(
+        name,
+        request.headers.get('Accept-Encoding', ''),
+        request.headers.get('If-None-Match')
+    )
+    if result is None:
+        return jsonify({'error': 'Not found'}), 404
+    status, body, headers = result
+    return Response(body, status=status, headers=headers)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
     try:
-        data = request.json
-        user_message = data.get('message', '').strip()
-        personality = data.get('personality', 'friendly')
+        limited = _check_rate_limit()
+        if limited:
+            return limited
+        
+        with STAGE_SECONDS.time('request_parse'):
+            data = request.json
+            user_message = data.get('message', '').strip()
+            personality = data.get('personality', 'friendly')
+            session_id = data.get('session_id')
         
         if not user_message:
 
             return jsonify({'error': 'Empty message'}), 400
         
         # Get response from chatbot engine
-        response = chatbot.get_response(user_message, personality)
+        with admission.admit() if admission else nullcontext(True) as admitted:
+            if admitted:
+                response, source, usage = chatbot.get_response_with_usage(user_message, personality, session_id)
+            elif admission.overflow == REJECT:
+                return _too_many_requests('Server overloaded', admission.retry_after())
+            else:
+                # Overflow skips the model and gets the knowledge base answer right away
+                response, source, usage = chatbot.shed_response(user_message, personality), 'shed', None
+        if conversation_log:
+            conversation_log.log(user_message, personality, source, time.perf_counter() - g.request_start)
+        
+        with STAGE_SECONDS.time('json_serialization'):
+            return jsonify({
+                'success': True,
+                'response': response,
+                'prompt': usage,
+                'timestamp': datetime.now().isoformat()
+            })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _check_rate_limit():
+    """429 response when the client is over its rate limit, else None"""
+    if not rate_limiter:
+        return None
+    wait = rate_limiter.acquire(request.remote_addr)
+    if not wait:
+        return None
+    ADMISSION_DECISIONS.inc('rate_limited')
+    return _too_many_requests('Rate limit exceeded', wait)
+
+def _too_many_requests(error, retry_after):
+    return jsonify({
+        'success': False,
+        'error': error
+    }), 429, {'Retry-After': str(math.ceil(retry_after))}
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream chat response chunks as Server-Sent Events"""
+    limited = _check_rate_limit()
+    if limited:
+        return limited
+    
+    data = request.json or {}
+    user_message = data.get('message', '').strip()
+    personality = data.get('personality', 'friendly')
+    session_id = data.get('session_id')
+    
+    if not user_message:
+        return jsonify({'error': 'Empty message'}), 400
+    
+    # The slot is held until the stream is closed, not just until this view returns
+    admitted = admission.acquire() if admission else True
+    if not admitted and admission.overflow == REJECT:
+        return _too_many_requests('Server overloaded', admission.retry_after())
+    
+    # after_request pops the start time before the stream is generated
+    request_start = g.request_start
+    
+    def generate():
+        try:
+            if admitted:
+                chunks = chatbot.stream_response_with_usage(user_message, personality, session_id)
+            else:
+                # Overflow skips the model and gets the knowledge base answer right away
+                chunks = [(chatbot.shed_response(user_message, personality), 'shed', None)]
+            source = usage = None
+            for chunk, source, usage in chunks:
+                yield _sse_event({'chunk': chunk})
+            if conversation_log:
+                conversation_log.log(user_message, personality, source, time.perf_counter() - request_start)
+            yield _sse_event({'prompt': usage, 'timestamp': datetime.now().isoformat()}, event='done')
+        except Exception as e:
+            yield _sse_event({'error': str(e)}, event='error')
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    if admission and admitted:
+        start = time.monotonic()
+        response.call_on_close(lambda: admission.release(time.monotonic() - start))
+    return response
+
+def _sse_event(payload, event=None):
+    """Format a payload as a Server-Sent Event"""
+    message = f"event: {event}\n" if event else ''
+    return message + f"data: {json.dumps(payload)}\n\n"
+
+def _batch_model_slot(client):
+    """admit callback for get_responses: charge each model call to the rate limit and admission"""
+    def admit():
+        if rate_limiter and rate_limiter.acquire(client):
+            ADMISSION_DECISIONS.inc('rate_limited')
+            return None
+        if not admission:
+            return lambda: None
+        if not admission.acquire():
+            return None
+        start = time.monotonic()
+        return lambda: admission.release(time.monotonic() - start)
+    return admit
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer a list of messages in one request"""
+    try:
+        data = request.json or {}
+        messages = data.get('messages')
+        personality = data.get('personality', 'friendly')
+        
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'success': False, 'error': 'messages must be a non-empty list'}), 400
+        if len(messages) > MAX_BATCH_SIZE:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_SIZE} messages per batch'}), 400
+        
+        limited = _check_rate_limit()
+        if limited:
+            return limited
+        
+        # Messages that reach the model are charged one by one, as single chats are
+        results = chatbot.get_responses(messages, personality, admit=_batch_model_slot(request.remote_addr))
         
         return jsonify({
             'success': True,
-            'response': response,
+            'results': results,
             'timestamp': datetime.now().isoformat()
         })
     
@@ -49,9 +293,59 @@ def health():
     return jsonify({
         'status': 'online',
         'version': '2.0',
+        'cache': chatbot.response_cache.stats() if chatbot.response_cache else None,
+        'sessions': chatbot.session_store.stats() if chatbot.session_store else None,
+        'snapshot': chatbot.answer_snapshot.stats() if chatbot.answer_snapshot is not None else None,
+        'knowledge_base': chatbot.kb.stats(),
+        'circuit_breaker': chatbot.circuit_breaker.stats() if chatbot.circuit_breaker else None,
+        'coalescing': chatbot.single_flight.stats() if chatbot.single_flight else None,
+        'admission': admission.stats() if admission else None,
+        'rate_limit': rate_limiter.stats() if rate_limiter else None,
+        'conversation_log': conversation_log.stats() if conversation_log else None,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness check: 503 while the worker drains
+    
+    The engine cannot start without a knowledge base and answers from it
+    when the model is down, so draining is the only state that should take
+    the worker out of rotation.
+    """
+    is_ready = not draining.is_set()
+    return jsonify({
+        'ready': is_ready,
+        'draining': draining.is_set(),
+        'pid': os.getpid()
+    }), 200 if is_ready else 503
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_knowledge_base():
+    """Recompile the knowledge base data file without restarting"""
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Admin endpoints are disabled'}), 404
+    # Constant-time comparison, so response timing does not reveal the token
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 403
+    
+    try:
+        kb = chatbot.reload_knowledge_base()
+        return jsonify({
+            'success': True,
+            'knowledge_base': kb.stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and counters in Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
     """Get suggested questions"""
@@ -0,0 +1,145 @@
+"""ASGI entry point with an async /api/chat route
+
+Run with any ASGI server, e.g. ``uvicorn asgi:app --port 5000``.
+/api/chat is served natively through ChatbotEngine.aget_response, so slow
+model calls do not tie up a worker. Other routes are delegated to the
+Flask app when asgiref is installed.
+"""
+
+import asyncio
+import json
+import math
+import time
+from datetime import datetime
+
+from admission import REJECT
+from app import app as flask_app, admission, chatbot, conversation_log, rate_limiter
+from metrics import ADMISSION_DECISIONS, REQUEST_SECONDS
+
+# Optional: Try importing asgiref to serve the remaining Flask routes
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    flask_asgi = WsgiToAsgi(flask_app)
+except ImportError:
+    flask_asgi = None
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-headers', b'Content-Type'),
+    (b'access-control-allow-methods', b'POST, OPTIONS'),
+]
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['path'] == '/api/chat':
+        if scope['method'] == 'OPTIONS':
+            await _send_json(send, 204, None)
+        elif scope['method'] == 'POST':
+            start = time.perf_counter()
+            status = await chat(scope, receive, send)
+            REQUEST_SECONDS.observe(time.perf_counter() - start, '/api/chat', str(status))
+        else:
+            await _send_json(send, 405, {'success': False, 'error': 'Method not allowed'})
+        return
+
+    if flask_asgi is not None:
+        await flask_asgi(scope, receive, send)
+    else:
+        await _send_json(send, 404, {'success': False, 'error': 'Not found'})
+
+
+async def chat(scope, receive, send):
+    """Handle chat messages without blocking the event loop; returns the status sent
+
+    Rate limits and admission apply as on the Flask /api/chat route.
+    """
+    start = time.perf_counter()
+    try:
+        if rate_limiter:
+            client = (scope.get('client') or ('unknown', 0))[0]
+            wait = rate_limiter.acquire(client)
+            if wait:
+                ADMISSION_DECISIONS.inc('rate_limited')
+                return await _too_many_requests(send, 'Rate limit exceeded', wait)
+
+        data = json.loads(await _read_body(receive) or b'{}')
+        user_message = data.get('message', '').strip()
+        personality = data.get('personality', 'friendly')
+        session_id = data.get('session_id')
+
+        if not user_message:
+            await _send_json(send, 400, {'error': 'Empty message'})
+            return 400
+
+        # Waiting in the admission queue blocks, so it happens off the event loop
+        admitted = await asyncio.to_thread(admission.acquire) if admission else True
+        if admitted:
+            admitted_at = time.monotonic()
+            try:
+                response, source, usage = await chatbot.aget_response_with_usage(user_message, personality, session_id)
+            finally:
+                if admission:
+                    admission.release(time.monotonic() - admitted_at)
+        elif admission.overflow == REJECT:
+            return await _too_many_requests(send, 'Server overloaded', admission.retry_after())
+        else:
+            # Overflow skips the model and gets the knowledge base answer right away
+            response, source, usage = chatbot.shed_response(user_message, personality), 'shed', None
+        if conversation_log:
+            conversation_log.log(user_message, personality, source, time.perf_counter() - start)
+
+        await _send_json(send, 200, {
+            'success': True,
+            'response': response,
+            'prompt': usage,
+            'timestamp': datetime.now().isoformat()
+        })
+        return 200
+
+    except Exception as e:
+        await _send_json(send, 500, {
+            'success': False,
+            'error': str(e)
+        })
+        return 500
+
+
+async def _read_body(receive):
+    """Collect the full request body"""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _too_many_requests(send, error, retry_after):
+    """Send a 429 response with Retry-After; returns the status"""
+    headers = [(b'retry-after', str(math.ceil(retry_after)).encode('ascii'))]
+    await _send_json(send, 429, {'success': False, 'error': error}, headers)
+    return 429
+
+
+async def _send_json(send, status, payload, extra_headers=()):
+    """Send a JSON response with CORS headers"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    headers = [(b'content-type', b'application/json')] + CORS_HEADERS + list(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    """Acknowledge ASGI startup and shutdown events"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,124 @@
+"""Shared message mix, statistics and result files for the benchmark scripts"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+# Questions answered by the knowledge base, with their relative frequency
+KNOWLEDGE_BASE_MESSAGES = [
+    ("Namaste!", 6),
+    ("Python kaise sikhun?", 8),
+    ("Web development kya hoti hai?", 6),
+    ("Machine Learning kaise seekhoon?", 6),
+    ("JavaScript kya hai?", 5),
+    ("Data Science career guidance dedo", 4),
+    ("API kya hota hai explain karo", 4),
+    ("React aur Vue mein kya difference hai?", 3),
+    ("Deep learning ke liye best resources?", 3),
+    ("Thank you!", 2),
+]
+
+# Questions no knowledge base entry covers
+UNKNOWN_MESSAGES = [
+    "Kubernetes cluster kaise scale karein?",
+    "Mera laptop slow kyun hai?",
+    "Quantum computing ka future kya hai?",
+    "Rust ya Go, backend ke liye kaunsa?",
+]
+
+# Share of each kind of request in the load test mix
+DEFAULT_MIX = {
+    'popular': 0.6,   # repeated knowledge base questions, mostly cache hits
+    'novel': 0.25,    # unique questions that always reach the model
+    'session': 0.15,  # follow-ups in a conversation, never cached
+}
+
+PERSONALITIES = ('friendly', 'professional', 'creative', 'formal')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples):
+    """Count, mean and tail percentiles of latency samples in seconds, as milliseconds"""
+    if not samples:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+def environment():
+    """Where a benchmark ran, so results from different machines are not mixed up"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def write_results(path, benchmark, config, results):
+    """Save results as JSON; returns the document written"""
+    document = {
+        'benchmark': benchmark,
+        'timestamp': datetime.now().isoformat(),
+        'environment': environment(),
+        'config': config,
+        'results': results,
+    }
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+    return document
+
+
+def compare(results, baseline_path, out=None):
+    """Print the change of every numeric result against a saved baseline file"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = _flatten(json.load(f).get('results', {}))
+    out = out or sys.stdout
+    print(f"\nCompared with {baseline_path}:", file=out)
+    for key, value in _flatten(results).items():
+        old = baseline.get(key)
+        if old is None or not isinstance(value, (int, float)):
+            continue
+        change = (value - old) / old * 100 if old else 0.0
+        print(f"  {key:<45} {old:>12.3f} -> {value:>12.3f}  ({change:+.1f}%)", file=out)
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
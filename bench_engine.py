@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Microbenchmarks for knowledge base routing and prompt building
+
+    python bench_engine.py --output bench_results/engine.json
+    python bench_engine.py --baseline bench_results/engine.json
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from bench_common import KNOWLEDGE_BASE_MESSAGES, UNKNOWN_MESSAGES, compare, write_results
+from chatbot_engine import ChatbotEngine
+from providers import StubProvider
+from session_store import MODEL, USER
+
+MESSAGES = [message for message, _ in KNOWLEDGE_BASE_MESSAGES] + UNKNOWN_MESSAGES
+
+# Ten remembered turns, the default session length
+HISTORY = [
+    (USER if i % 2 == 0 else MODEL, f"Turn {i}: " + "Python aur Flask ke baare mein sawaal " * 3)
+    for i in range(10)
+]
+
+
+def measure(func, loops, repeat, batch=False):
+    """Microseconds per message for each of ``repeat`` rounds over the message list
+
+    With batch, func is called once per pass with the whole list.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            if batch:
+                func(MESSAGES)
+            else:
+                for message in MESSAGES:
+                    func(message)
+        rounds.append((time.perf_counter() - start) / (loops * len(MESSAGES)) * 1e6)
+    return {
+        'median_us': statistics.median(rounds),
+        'min_us': min(rounds),
+        'max_us': max(rounds),
+    }
+
+
+def run(loops=200, repeat=5, seed=0):
+    """Time each engine hot path and return results keyed by benchmark name"""
+    random.seed(seed)
+    bot = ChatbotEngine(provider=StubProvider(latency=0))
+    # Styling runs on answers, so time it on the knowledge base answer of each message
+    answers = {message: bot._knowledge_base_response(message, 'friendly') for message in MESSAGES}
+    benchmarks = {
+        'fallback_response': lambda message: bot._fallback_response(message, 'friendly'),
+        'generate_smart_response': bot._generate_smart_response,
+        'knowledge_base_search': lambda message: bot._current_kb().search(message),
+        'retrieval': lambda message: bot._current_kb().retriever.search(message),
+        'build_prompt': lambda message: bot._build_prompt(message, 'friendly'),
+        'build_prompt_with_history': lambda message: bot._build_prompt(message, 'friendly', HISTORY),
+        'format_formal': lambda message: bot._format_with_personality(answers[message], 'formal'),
+    }
+    for func in benchmarks.values():
+        func(MESSAGES[0])  # warm up
+    results = {name: measure(func, loops, repeat) for name, func in benchmarks.items()}
+    # The whole message list scored in one call, reported per message
+    results['retrieval_batch'] = measure(bot._current_kb().retriever.search_batch, loops, repeat, batch=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loops', type=int, default=200, help='passes over the message list per round')
+    parser.add_argument('--repeat', type=int, default=5, help='timed rounds per benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='compare with an earlier JSON results file')
+    args = parser.parse_args()
+
+    results = run(args.loops, args.repeat, args.seed)
+
+    print("\n" + "=" * 60)
+    print(f"ENGINE MICROBENCHMARKS (microseconds per message, {len(MESSAGES)} messages)")
+    print("=" * 60 + "\n")
+    print(f"{'benchmark':<28} {'median':>10} {'min':>10} {'max':>10}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['median_us']:>10.2f} {result['min_us']:>10.2f} {result['max_us']:>10.2f}")
+
+    config = {'loops': args.loops, 'repeat': args.repeat, 'seed': args.seed, 'messages': len(MESSAGES)}
+    write_results(args.output, 'engine', config, results)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark compiled keyword index against per-keyword substring scans"""
+
+import random
+import string
+import time
+
+from keyword_index import KeywordIndex
+
+MESSAGES = [
+    "Namaste! Mujhe Python ke baare mein batao",
+    "Web development kya hoti hai?",
+    "Machine Learning kaise seekhoon?",
+    "Data Science career guidance dedo",
+    "API kya hota hai explain karo",
+]
+VOCABULARY_SIZES = [10, 100, 1000, 5000]
+ROUNDS = 200
+
+
+def make_vocabulary(size, seed=42):
+    """Generate random keywords of realistic length"""
+    rng = random.Random(seed)
+    return [
+        ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        for _ in range(size)
+    ]
+
+
+def time_per_message(func):
+    """Average microseconds per message over several rounds"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for message in MESSAGES:
+            func(message.lower())
+    elapsed = time.perf_counter() - start
+    return elapsed / (ROUNDS * len(MESSAGES)) * 1e6
+
+
+def main():
+    print("\n" + "=" * 60)
+    print("KEYWORD MATCHING BENCHMARK (microseconds per message)")
+    print("=" * 60 + "\n")
+    print(f"{'keywords':>10} {'substring scan':>16} {'keyword index':>16}")
+
+    for size in VOCABULARY_SIZES:
+        vocabulary = make_vocabulary(size)
+        index = KeywordIndex((word, word) for word in vocabulary)
+
+        scan = time_per_message(lambda text: [word for word in vocabulary if word in text])
+        compiled = time_per_message(index.search)
+        print(f"{size:>10} {scan:>16.1f} {compiled:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
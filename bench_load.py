@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Open-loop load generator for /api/chat
+
+    python bench_load.py --rate 100 --duration 30 --output bench_results/load.json
+    python bench_load.py --url http://127.0.0.1:5000 --rate 20
+
+Without --url the Flask app is served in-process with a StubProvider, so no
+network or API key is needed. Requests are sent on a fixed schedule whether
+or not earlier ones have finished, and latency is measured from each
+request's scheduled send time, so queueing behind a slow server shows up in
+the percentiles instead of silently lowering the request rate.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_common import (
+    DEFAULT_MIX, KNOWLEDGE_BASE_MESSAGES, PERSONALITIES, UNKNOWN_MESSAGES,
+    compare, summarize, write_results,
+)
+
+SESSIONS = 20
+
+
+def plan_requests(rate, duration, mix=DEFAULT_MIX, arrival='constant', seed=0):
+    """Deterministic list of (send offset in seconds, kind, JSON payload)"""
+    rng = random.Random(seed)
+    messages = [message for message, _ in KNOWLEDGE_BASE_MESSAGES]
+    weights = [weight for _, weight in KNOWLEDGE_BASE_MESSAGES]
+    kinds = list(mix)
+    kind_weights = [mix[kind] for kind in kinds]
+
+    plan = []
+    offset = 0.0
+    for i in range(int(rate * duration)):
+        kind = rng.choices(kinds, kind_weights)[0]
+        payload = {'personality': rng.choice(PERSONALITIES)}
+        if kind == 'novel':
+            payload['message'] = f"{rng.choice(UNKNOWN_MESSAGES)} (#{i})"
+        else:
+            payload['message'] = rng.choices(messages, weights)[0]
+        if kind == 'session':
+            payload['session_id'] = f"bench-{rng.randrange(SESSIONS)}"
+        plan.append((offset, kind, payload))
+        offset += rng.expovariate(rate) if arrival == 'poisson' else 1 / rate
+    return plan
+
+
+def send(url, payload, timeout):
+    """POST one chat message; returns the HTTP status (0 for connection errors)"""
+    body = json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 0
+
+
+def run_load(base_url, plan, concurrency=64, timeout=30):
+    """Replay a request plan against base_url and summarize latency and throughput"""
+    url = base_url.rstrip('/') + '/api/chat'
+    records = []
+    lock = threading.Lock()
+
+    def worker(scheduled, kind, payload):
+        sent = time.perf_counter()
+        status = send(url, payload, timeout)
+        done = time.perf_counter()
+        with lock:
+            records.append((kind, status, done - scheduled, done - sent, done))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, kind, payload in plan:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(worker, scheduled, kind, payload)
+    elapsed = max((record[4] for record in records), default=start) - start
+
+    statuses = {}
+    for _, status, _, _, _ in records:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [record for record in records if record[1] == 200]
+    return {
+        'requests': len(records),
+        'errors': len(records) - len(ok),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+        'latency': summarize([record[2] for record in ok]),
+        'service_time': summarize([record[3] for record in ok]),
+        'by_kind': {
+            kind: summarize([record[2] for record in ok if record[0] == kind])
+            for kind in sorted({record[0] for record in records})
+        },
+        'status_codes': statuses,
+    }
+
+
+def start_local_server(provider):
+    """Serve the Flask app on a free local port with its engine using provider
+
+    Returns (base_url, stop); stop() shuts the server down and restores the
+    app's original engine.
+    """
+    import logging
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    from chatbot_engine import ChatbotEngine
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    original = app_module.chatbot
+    app_module.chatbot = ChatbotEngine(provider=provider)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        thread.join()
+        app_module.chatbot = original
+
+    return f"http://127.0.0.1:{server.port}", stop
+
+
+def print_report(results, rate, duration):
+    print("\n" + "=" * 70)
+    print(f"LOAD TEST: /api/chat at {rate:g} req/s for {duration:g}s")
+    print("=" * 70 + "\n")
+    print(f"requests {results['requests']}, errors {results['errors']}, "
+          f"throughput {results['throughput_rps']:.1f} req/s, status codes {results['status_codes']}\n")
+    print(f"{'latency (ms)':<16} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = [('all', results['latency']), ('service time', results['service_time'])]
+    rows += sorted(results['by_kind'].items())
+    for name, summary in rows:
+        if not summary['count']:
+            continue
+        print(f"{name:<16} {summary['count']:>7} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} "
+              f"{summary['p99_ms']:>9.1f} {summary['max_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='server to test; default serves the app in-process with a stub model')
+    parser.add_argument('--rate', type=float, default=50, help='target requests per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load to generate')
+    parser.add_argument('--arrival', choices=('constant', 'poisson'), default='constant')
+    parser.add_argument('--concurrency', type=int, default=64, help='client threads sending requests')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stub-latency-ms', type=float, default=50)
+    parser.add_argument('--stub-jitter-ms', type=float, default=10)
+    parser.add_argument('--stub-distribution', default='lognormal')
+    parser.add_argument('--stub-failure-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='compare with an earlier JSON results file')
+    args = parser.parse_args()
+
+    config = {
+        'url': args.url, 'rate': args.rate, 'duration': args.duration, 'arrival': args.arrival,
+        'concurrency': args.concurrency, 'seed': args.seed, 'mix': DEFAULT_MIX,
+    }
+    stop = None
+    base_url = args.url
+    if base_url is None:
+        from providers import StubProvider
+        provider = StubProvider(
+            latency=args.stub_latency_ms / 1000,
+            jitter=args.stub_jitter_ms / 1000,
+            distribution=args.stub_distribution,
+            failure_rate=args.stub_failure_rate,
+            seed=args.seed,
+        )
+        config['stub'] = {
+            'latency_ms': args.stub_latency_ms, 'jitter_ms': args.stub_jitter_ms,
+            'distribution': args.stub_distribution, 'failure_rate': args.stub_failure_rate,
+        }
+        base_url, stop = start_local_server(provider)
+
+    try:
+        plan = plan_requests(args.rate, args.duration, arrival=args.arrival, seed=args.seed)
+        results = run_load(base_url, plan, args.concurrency, args.timeout)
+    finally:
+        if stop:
+            stop()
+
+    print_report(results, args.rate, args.duration)
+    write_results(args.output, 'load', config, results)
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark worker startup: cold import, engine construction and first response"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 7
+
+# Runs in a fresh interpreter so every import is cold
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from chatbot_engine import ChatbotEngine
+bot = ChatbotEngine()
+constructed = time.perf_counter()
+bot.get_response('Python kaise sikhun?')
+answered = time.perf_counter()
+print(json.dumps({{
+    'import': imported - start,
+    'construct': constructed - imported,
+    'first_response': answered - constructed,
+    'total': answered - start,
+    'sdk_loaded': 'google.generativeai' in sys.modules,
+}}))
+"""
+
+
+def probe(module):
+    """Time one cold start in a subprocess"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module)],
+        cwd=here, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    print("\n" + "=" * 70)
+    print(f"STARTUP BENCHMARK (median of {RUNS} cold starts, milliseconds)")
+    print("=" * 70 + "\n")
+    print(f"{'module':>16} {'import':>10} {'construct':>10} {'first reply':>12} {'total':>10}  SDK loaded")
+
+    for module in ('chatbot_engine', 'app'):
+        runs = [probe(module) for _ in range(RUNS)]
+        median = {key: statistics.median(run[key] for run in runs) * 1000 for key in ('import', 'construct', 'first_response', 'total')}
+        print(f"{module:>16} {median['import']:>10.1f} {median['construct']:>10.1f} "
+              f"{median['first_response']:>12.1f} {median['total']:>10.1f}  {runs[-1]['sdk_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
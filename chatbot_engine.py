@@ -1,348 +1,739 @@
-import re
+import threading
+import time
+import weakref
 from datetime import datetime
 import json
 import os
 from dotenv import load_dotenv
-
-# Optional: Try importing google generativeai if available
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except:
-    GENAI_AVAILABLE = False
+from knowledge_base import DEFAULT_PATH as DEFAULT_KNOWLEDGE_BASE_PATH, KnowledgeBase, render
+from response_cache import ResponseCache, create_response_cache
+from answer_snapshot import create_answer_snapshot
+from session_store import create_session_store
+from providers import create_provider
+from circuit_breaker import create_circuit_breaker
+from single_flight import create_single_flight
+from prompt_builder import create_prompt_builder
+from postprocess import FORMAL_SUBSTITUTIONS, build_formatters
+from metrics import MODEL_RESPONSES, STAGE_SECONDS
 
 # Load API key from .env file
 load_dotenv()
-api_key = os.getenv('GOOGLE_API_KEY')
-if api_key and GENAI_AVAILABLE:
-    try:
-        genai.configure(api_key=api_key)
-    except:
-        GENAI_AVAILABLE = False
+# Cap on in-flight model calls and per-call deadline (seconds) for the async path
+MAX_CONCURRENT_MODEL_CALLS = int(os.getenv('CHATBOT_MAX_CONCURRENCY', '16'))
+MODEL_TIMEOUT = float(os.getenv('CHATBOT_MODEL_TIMEOUT', '15'))
+
+# Knowledge base data file and how often (seconds) to check it for changes; 0 disables
+KNOWLEDGE_BASE_PATH = os.getenv('CHATBOT_KB_PATH', DEFAULT_KNOWLEDGE_BASE_PATH)
+KNOWLEDGE_BASE_RELOAD_INTERVAL = float(os.getenv('CHATBOT_KB_RELOAD_INTERVAL', '2'))
+# Cosine similarity a knowledge base answer needs before it is served for an unmatched message
+RETRIEVAL_THRESHOLD = float(os.getenv('CHATBOT_RETRIEVAL_THRESHOLD', '0.3'))
 
 class ChatbotEngine:
     """Advanced chatbot engine with Gemini AI"""
+
+    GENERATION_CONFIG = {
+        'temperature': 0.7,
+        'top_p': 0.9,
+    }
     
-    def __init__(self):
-        # Initialize model only if API is available
-        self.model = None
-        if GENAI_AVAILABLE:
-            try:
-                # Try multiple models in order of preference
-                try:
-                    self.model = genai.GenerativeModel('gemini-2.0-flash')
-                except:
-                    try:
-                        self.model = genai.GenerativeModel('gemini-1.5-flash')
-                    except:
-                        self.model = genai.GenerativeModel('gemini-pro')
-            except:
-                self.model = None
-        
-        self.knowledge_base = self._load_knowledge_base()
+    def __init__(self, response_cache=None, session_store=None, provider=None, circuit_breaker=None,
+                 answer_snapshot=None):
+        # LLM backend picked by CHATBOT_PROVIDER; Gemini creates its model on first use
+        self.provider = provider if provider is not None else create_provider()
+        # Skips the model while it keeps failing, so requests go straight to the knowledge base
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else create_circuit_breaker()
+        # Concurrent identical questions share one model call
+        self.single_flight = create_single_flight()
+        
+        self.kb_path = KNOWLEDGE_BASE_PATH
+        self.kb_reload_interval = KNOWLEDGE_BASE_RELOAD_INTERVAL
+        self.retrieval_threshold = RETRIEVAL_THRESHOLD
+        self.kb = self._load_knowledge_base()
+        self._kb_lock = threading.Lock()
+        self._next_kb_check = time.monotonic() + self.kb_reload_interval
+        self.response_cache = response_cache if response_cache is not None else create_response_cache()
+        # Answers precomputed offline by precompute.py, memory-mapped and shared by workers
+        self.answer_snapshot = answer_snapshot if answer_snapshot is not None else create_answer_snapshot()
+        self.session_store = session_store if session_store is not None else create_session_store()
+        
+        # Async model calls run on a bounded pool, gated per event loop by a semaphore
+        self.max_concurrency = MAX_CONCURRENT_MODEL_CALLS
+        self.model_timeout = MODEL_TIMEOUT
+        self._model_executor = None
+        self._executor_lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
         self.personality_styles = {
             'friendly': {'prefix': '😊 ', 'tone': 'casual and friendly'},
-            'professional': {'prefix': '', 'tone': 'formal and professional'},
-            'creative': {'prefix': '✨ ', 'tone': 'creative and playful'},
-            'formal': {'prefix': '', 'tone': 'respectful and formal'}
+            'professional': {'prefix': '', 'tone': 'formal and professional', 'strip_emoji': True},
+            'creative': {'prefix': '✨ ', 'tone': 'creative and playful', 'decorate': True},
+            'formal': {'prefix': '', 'tone': 'respectful and formal', 'strip_emoji': True,
+                       'substitutions': FORMAL_SUBSTITUTIONS}
         }
+        # Answer styling compiled once per personality, usable on whole or streamed text
+        self.formatters = build_formatters(self.personality_styles)
+        # Prompt templates and output caps compiled once per personality
+        self.prompt_builder = create_prompt_builder(self.personality_styles, self.GENERATION_CONFIG)
     
     def _load_knowledge_base(self):
-        """Load knowledge base for responses"""
-        return {
-            'greetings': {
-                'keywords': ['hello', 'hi', 'hey', 'namaste', 'salaam', 'shukriya'],
-                'responses': [
-                    'Namaste! Mujhe aap se milkar khushi hui! 👋',
-                    'Hey! Main yahan hoon aapki madad karne ke liye! 🤖',
-                    'Shukriya poochne ke liye! Main ready hoon! 💪',
-                    'Salaam! Kya main kuch kar sakta hoon?'
-                ]
-            },
-            'programming': {
-                'keywords': ['python', 'javascript', 'java', 'c++', 'programming', 'coding', 'code'],
-                'responses': {
-                    'python': [
-                        'Python ek powerful aur easy programming language hai! Python machine learning, web development, data science sabmein use hoti hai.',
-                        'Python learning ke liye Python.org par ja sakte ho ya YouTube par tutorials dekh sakte ho.',
-                        'Python beginner-friendly hai aur syntax bhi bahut simple hai!'
-                    ],
-                    'javascript': [
-                        'JavaScript web development ka heart hai! Ye browser mein chaltaa hai aur interactive websites banate hain.',
-                        'Frontend development ke liye JavaScript zaroori hai. React, Vue, Angular jaise frameworks hain.',
-                        'JavaScript sikhne se web development ka raasta khul jata hai!'
-                    ],
-                    'programming': [
-                        'Programming sikhne ke liye basics se shuru karo - variables, loops, functions samajho.',
-                        'Regular practice karoge toh programming aasan ho jayegi!',
-                        'Choose ek language aur usi mein expert ban jao!'
-                    ]
-                }
-            },
-            'ai_ml': {
-                'keywords': ['ai', 'machine learning', 'deep learning', 'neural', 'tensorflow', 'pytorch', 'data science'],
-                'responses': {
-                    'machine learning': [
-                        'Machine Learning ek aise algorithms use karta hai jo data se seekhte hain aur predictions karate hain.',
-                        'ML ke 3 types hain: Supervised Learning, Unsupervised Learning, Reinforcement Learning',
-                        'ML seekhne ke liye Python, Math (Linear Algebra, Probability) zaroori hai!'
-                    ],
-                    'ai': [
-                        'Artificial Intelligence ka matlab machine ko human-like intelligence dena.',
-                        'AI future ka field hai! ChatGPT, DALL-E ye sab AI examples hain.',
-                        'AI seekhne se pehle ML ke fundamentals samajh lo.'
-                    ],
-                    'data science': [
-                        'Data Science = Programming + Statistics + Domain Knowledge',
-                        'Data scientist ko data analyze karke insights nikalne hote hain.',
-                        'Python, SQL, Pandas, NumPy data science ke essential tools hain!'
-                    ]
-                }
-            },
-            'web_development': {
-                'keywords': ['web', 'website', 'frontend', 'backend', 'html', 'css', 'react', 'node', 'express'],
-                'responses': {
-                    'web': [
-                        'Web development mein HTML, CSS, JavaScript use hote hain.',
-                        'Frontend aur Backend ye dono parts hain web development mein.',
-                        'Responsive websites banane ke liye modern CSS frameworks use karo!'
-                    ],
-                    'frontend': [
-                        'Frontend wo part hai jo user ko dikhta hai - UI/UX',
-                        'React, Vue, Angular ye popular frontend frameworks hain.',
-                        'HTML, CSS, JavaScript frontend development ke basics hain.'
-                    ],
-                    'backend': [
-                        'Backend mein database, server, logic sab hota hai.',
-                        'Python (Flask, Django), Node.js, Java ye backend ke liye use hote hain.',
-                        'Backend secure aur scalable hona zaroori hai!'
-                    ]
-                }
-            },
-            'career': {
-                'keywords': ['career', 'job', 'salary', 'internship', 'company', 'interview', 'hiring'],
-                'responses': {
-                    'career': [
-                        'Tech career mein bahut scope hai! Aap front-end, back-end, full-stack, data science choose kar sakte ho.',
-                        'Resume strong banao aur portfolio projects banaao!',
-                        'Interviews ke liye DSA (Data Structures & Algorithms) important hai.'
-                    ],
-                    'job': [
-                        'Job dhundne ke liye LinkedIn, Indeed, Glassdoor use karo.',
-                        'Internships se experience milega aur first job aasan ho jayega.',
-                        'Networking bhi important hai - tech communities mein join karo!'
-                    ]
-                }
-            }
-        }
+        """Load and compile the knowledge base data file"""
+        return KnowledgeBase.load(self.kb_path)
     
-    def get_response(self, user_message, personality='friendly'):
+    @property
+    def knowledge_base(self):
+        """Compiled knowledge base categories"""
+        return self.kb.categories
+    
+    def reload_knowledge_base(self):
+        """Recompile the knowledge base file and swap it in atomically
+        
+        On error the current knowledge base stays in place and the error is
+        raised to the caller.
+        """
+        with self._kb_lock:
+            kb = self._load_knowledge_base()
+            self.kb = kb
+            return kb
+    
+    def _current_kb(self):
+        """Compiled knowledge base, reloaded first if the data file changed"""
+        kb = self.kb
+        if self.kb_reload_interval <= 0 or time.monotonic() < self._next_kb_check:
+            return kb
+        # Only one thread checks the file; others keep using the current one
+        if not self._kb_lock.acquire(blocking=False):
+            return kb
+        try:
+            self._next_kb_check = time.monotonic() + self.kb_reload_interval
+            if os.stat(self.kb_path).st_mtime_ns != kb.mtime:
+                kb = self.kb = self._load_knowledge_base()
+                print(f"Knowledge base reloaded from {self.kb_path}")
+        except Exception as e:
+            print(f"Knowledge Base Reload Error: {e}")
+        finally:
+            self._kb_lock.release()
+        return kb
+    
+    def get_response(self, user_message, personality='friendly', session_id=None):
         """Get response from chatbot using Gemini AI or enhanced knowledge base"""
+        return self.get_response_with_source(user_message, personality, session_id)[0]
+    
+    def get_response_with_source(self, user_message, personality='friendly', session_id=None):
+        """Like get_response, but returns (response, source)
+        
+        The source is where the answer came from: 'snapshot', 'model', 'cache'
+        or 'fallback'.
+        """
+        response, source, _ = self.get_response_with_usage(user_message, personality, session_id)
+        return response, source
+    
+    def get_response_with_usage(self, user_message, personality='friendly', session_id=None):
+        """Like get_response_with_source, but returns (response, source, usage)
+        
+        usage is the prompt estimate of the model call that produced the
+        answer (see PromptBuilder.usage), or None for answers that did not
+        come from the model.
+        """
+        history = self._session_history(session_id)
+        response, source, usage = self._get_response(user_message, personality, history)
+        self._remember(session_id, user_message, response)
+        return response, source, usage
+    
+    def shed_response(self, user_message, personality='friendly'):
+        """Knowledge base answer for a request turned away under overload"""
+        self._count(personality, 'shed')
+        return self._fallback_response(user_message, personality)
+    
+    def _get_response(self, user_message, personality, history):
+        """Answer one message given the earlier turns of its conversation"""
         try:
+            # Serve popular questions from the snapshot, repeated ones from the response cache
+            cache_key = self._cache_key(user_message, personality, history)
+            precomputed = self._snapshot_get(cache_key)
+            if precomputed is not None:
+                self._count(personality, 'snapshot')
+                return precomputed, 'snapshot', None
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._count(personality, 'cache')
+                return cached, 'cache', None
+            
             # Try Gemini API first if available
-            if self.model and GENAI_AVAILABLE:
+            try:
+                text = self._coalesce(cache_key, lambda: self._call_model(user_message, personality, history))
+                if text:
+                    self._count(personality, 'model')
+                    self._cache_set(cache_key, text)
+                    return text, 'model', self._prompt_usage(user_message, personality, history)
+            except Exception as e:
+                print(f"Gemini API Error: {e}")
+                self._count(personality, 'model_failure')
+                # Fall through to fallback
+            
+            # Fallback to knowledge base
+            self._count(personality, 'fallback')
+            return self._fallback_response(user_message, personality), 'fallback', None
+                
+        except Exception as e:
+            # Final fallback
+            print(f"Error: {e}")
+            self._count(personality, 'fallback')
+            return self._fallback_response(user_message, personality), 'fallback', None
+    
+    def _call_model(self, user_message, personality, history):
+        """Model answer for a message, or None when no model call is allowed"""
+        if not self._model_available():
+            return None
+        try:
+            text = self._generate_text(
+                self._build_prompt(user_message, personality, history),
+                self._generation_config(personality)
+            )
+        except Exception:
+            self._record_model_call(False)
+            raise
+        self._record_model_call(True)
+        return self._format_with_personality(text, personality) if text else text
+    
+    def _coalesce(self, key, func):
+        """Run func, sharing one call among concurrent callers with the same key
+        
+        Messages with conversation history have no key and always run alone.
+        """
+        if key is None or self.single_flight is None:
+            return func()
+        return self.single_flight.do(key, func)
+    
+    async def aget_response(self, user_message, personality='friendly', session_id=None, timeout=None):
+        """Async variant of get_response with bounded concurrency and a deadline
+        
+        Waiting for a free model slot counts against the deadline. When the
+        deadline passes the knowledge base answer is returned instead.
+        """
+        response, _ = await self.aget_response_with_source(user_message, personality, session_id, timeout)
+        return response
+    
+    async def aget_response_with_source(self, user_message, personality='friendly', session_id=None, timeout=None):
+        """Like aget_response, but returns (response, source)"""
+        response, source, _ = await self.aget_response_with_usage(user_message, personality, session_id, timeout)
+        return response, source
+    
+    async def aget_response_with_usage(self, user_message, personality='friendly', session_id=None, timeout=None):
+        """Like aget_response, but returns (response, source, usage) as get_response_with_usage does"""
+        import asyncio
+        
+        # Session, snapshot and cache backends may be remote; keep them off the event loop
+        history = await asyncio.to_thread(self._session_history, session_id)
+        response, source, usage = await self._aget_response(user_message, personality, history, timeout)
+        await asyncio.to_thread(self._remember, session_id, user_message, response)
+        return response, source, usage
+    
+    async def _aget_response(self, user_message, personality, history, timeout):
+        import asyncio
+        
+        timeout = self.model_timeout if timeout is None else timeout
+        try:
+            cache_key = self._cache_key(user_message, personality, history)
+            precomputed = await asyncio.to_thread(self._snapshot_get, cache_key)
+            if precomputed is not None:
+                self._count(personality, 'snapshot')
+                return precomputed, 'snapshot', None
+            cached = await asyncio.to_thread(self._cache_get, cache_key)
+            if cached is not None:
+                self._count(personality, 'cache')
+                return cached, 'cache', None
+            
+            if self._model_available():
                 try:
-                    # Get personality tone
-                    tone = self.personality_styles.get(personality, self.personality_styles['friendly'])['tone']
-                    
-                    # Create enhanced prompt with better instructions
-                    system_prompt = f"""You are an expert tech assistant who specializes in programming, web development, machine learning, and AI.
-Your tone should be: {tone}
-Important instructions:
-- Respond in Hindi-English mix (Hinglish) style
-- Provide detailed, informative, and helpful answers
-- Give practical examples and tips when relevant
-- Be conversational but professional
-- Add relevant emojis based on the personality (3-4 max)
-- Keep responses clear and well-structured
-- If appropriate, break down complex topics into simple parts
-
-User message: {user_message}
-
-Provide a comprehensive and helpful response:"""
-                    
-                    # Generate response using Gemini with better parameters
-                    response = self.model.generate_content(
-                        system_prompt,
-                        generation_config={
-                            'temperature': 0.7,
-                            'top_p': 0.9,
-                        }
+                    text = await asyncio.wait_for(
+                        self._agenerate_text(
+                            self._build_prompt(user_message, personality, history),
+                            self._generation_config(personality)
+                        ),
+                        timeout
                     )
-                    
-                    if response and response.text:
-                        return response.text.strip()
+                    self._record_model_call(True)
+                    if text:
+                        text = self._format_with_personality(text, personality)
+                        self._count(personality, 'model')
+                        await asyncio.to_thread(self._cache_set, cache_key, text)
+                        return text, 'model', self._prompt_usage(user_message, personality, history)
+                except asyncio.TimeoutError:
+                    print(f"Gemini API Timeout: no response within {timeout}s")
+                    self._record_model_call(False)
+                    self._count(personality, 'model_failure')
                 except Exception as e:
                     print(f"Gemini API Error: {e}")
-                    # Fall through to fallback
+                    self._record_model_call(False)
+                    self._count(personality, 'model_failure')
             
-            # Fallback to knowledge base
-            return self._fallback_response(user_message, personality)
-                
+            self._count(personality, 'fallback')
+            return self._fallback_response(user_message, personality), 'fallback', None
+        
         except Exception as e:
-            # Final fallback
             print(f"Error: {e}")
-            return self._fallback_response(user_message, personality)
+            self._count(personality, 'fallback')
+            return self._fallback_response(user_message, personality), 'fallback', None
     
-    def _fallback_response(self, user_message, personality='friendly'):
-        """Fallback response using knowledge base"""
-        user_message_lower = user_message.lower()
+    async def _agenerate_text(self, prompt, generation_config=None):
+        """Run a model call on the bounded pool while holding a concurrency slot"""
+        import asyncio
         
-        # Try smart response first for better quality
-        smart_response = self._generate_smart_response(user_message)
-        if smart_response:
-            return smart_response
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._get_model_executor(), self._generate_text, prompt, generation_config
+            )
+        except BaseException:
+            semaphore.release()
+            raise
         
-        # Check for greetings
-        if self._matches_keywords(user_message_lower, self.knowledge_base['greetings']['keywords']):
-            response = self._get_random_response(self.knowledge_base['greetings']['responses'])
-            return response
+        def release(done):
+            semaphore.release()
+            # Mark errors as retrieved when the caller already timed out
+            if not done.cancelled():
+                done.exception()
         
-        # Check for programming topics
-        if self._matches_keywords(user_message_lower, self.knowledge_base['programming']['keywords']):
-            response = self._get_specific_response(user_message_lower, self.knowledge_base['programming']['responses'])
-            if response:
-                return response
+        # Keep the slot until the call really finishes, even if the caller gave up
+        future.add_done_callback(release)
+        return await asyncio.shield(future)
+    
+    def after_fork(self):
+        """Reset per-process resources in a worker forked from a preloaded engine
         
-        # Check for AI/ML topics
-        if self._matches_keywords(user_message_lower, self.knowledge_base['ai_ml']['keywords']):
-            response = self._get_specific_response(user_message_lower, self.knowledge_base['ai_ml']['responses'])
-            if response:
-                return response
+        The compiled knowledge base and configuration stay shared copy-on-write;
+        thread pools and database connections cannot cross fork.
+        """
+        self._model_executor = None
+        self._executor_lock = threading.Lock()
+        self._kb_lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+        if self.response_cache is not None:
+            self.response_cache.reopen()
+        if self.answer_snapshot is not None:
+            self.answer_snapshot.after_fork()
+    
+    def _get_model_executor(self):
+        """Bounded thread pool shared by async and batch model calls"""
+        from concurrent.futures import ThreadPoolExecutor
         
-        # Check for web development topics
-        if self._matches_keywords(user_message_lower, self.knowledge_base['web_development']['keywords']):
-            response = self._get_specific_response(user_message_lower, self.knowledge_base['web_development']['responses'])
+        with self._executor_lock:
+            if self._model_executor is None:
+                self._model_executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='model'
+                )
+            return self._model_executor
+    
+    def _get_semaphore(self):
+        """Concurrency semaphore for the running event loop"""
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+    
+    def _model_available(self):
+        """Whether an LLM provider is configured, ready and not cut off by the circuit breaker
+        
+        A True result admits one model call, whose outcome must be passed to
+        _record_model_call.
+        """
+        if not self._provider_ready():
+            return False
+        return self.circuit_breaker is None or self.circuit_breaker.allow_request()
+    
+    def _provider_ready(self):
+        """Whether an LLM provider is configured and ready, without taking a circuit breaker permit"""
+        return self.provider is not None and self.provider.available()
+    
+    def _record_model_call(self, success):
+        """Report a model call outcome to the circuit breaker"""
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+    
+    def _generate_text(self, prompt, generation_config=None):
+        """Call the LLM provider and return the response text"""
+        # Generate response with better parameters
+        with STAGE_SECONDS.time('model_call'):
+            return self.provider.generate(prompt, generation_config or self.GENERATION_CONFIG)
+    
+    def _generation_config(self, personality):
+        """Generation settings with the personality's output token cap"""
+        return self.prompt_builder.template(personality).generation_config
+    
+    def _prompt_usage(self, user_message, personality, history):
+        """Estimated prompt tokens, truncation and output cap of the model call for a message"""
+        return self.prompt_builder.usage(user_message, personality, history)
+    
+    def get_responses(self, messages, personality='friendly', admit=None):
+        """Answer a batch of messages, fanning model calls out concurrently
+        
+        Identical messages are answered once. Cached answers and messages the
+        knowledge base covers skip the model; the rest run on the bounded
+        model pool within one deadline, sharing in-flight calls for the same
+        question with get_response. Returns one result dict per message, in
+        input order, with its source and any per-item error.
+        
+        admit, when given, is called before each model call and returns a
+        callable to run once that call finishes, or None to give the message
+        the shed knowledge base answer instead.
+        """
+        from concurrent.futures import TimeoutError as FuturesTimeoutError
+        
+        results = [None] * len(messages)
+        pending = {}
+        
+        for i, message in enumerate(messages):
+            if not isinstance(message, str) or not message.strip():
+                results[i] = self._batch_result(message, None, 'error', 'Empty message')
+                continue
+            key = self._cache_key(message, personality)
+            pending.setdefault(key, []).append(i)
+        
+        kb = self._current_kb()
+        local = {}
+        for key, indexes in pending.items():
+            message = messages[indexes[0]].strip()
+            source, response = 'snapshot', self._snapshot_get(key)
+            if response is None:
+                source, response = 'cache', self._cache_get(key)
+            if response is None:
+                source, response = 'knowledge_base', self._generate_smart_response(message, specific_only=True, kb=kb)
+                if response is not None:
+                    response = self._format_with_personality(response, personality)
+            if response is not None:
+                local[key] = (source, response)
+        
+        # Score every message no keyword matched against the knowledge base in one pass
+        unmatched = [key for key in pending if key not in local]
+        retrieved = self._retrieve_batch([messages[pending[key][0]].strip() for key in unmatched], kb)
+        for key, response in zip(unmatched, retrieved):
+            if response is not None:
+                local[key] = ('retrieval', self._format_with_personality(response, personality))
+        
+        futures = {}
+        for key, indexes in pending.items():
+            message = messages[indexes[0]].strip()
+            source, response = local.get(key, (None, None))
+            if response is None and self._provider_ready():
+                release = admit() if admit is not None else (lambda: None)
+                if release is not None:
+                    future = self._get_model_executor().submit(
+                        self._coalesce, key, lambda message=message: self._call_model(message, personality, [])
+                    )
+                    future.add_done_callback(lambda done, release=release: release())
+                    futures[key] = future
+                    continue
+                source, response = 'shed', self.shed_response(message, personality)
+            elif response is None:
+                source, response = 'fallback', self._fallback_response(message, personality)
+            if source != 'shed':
+                self._count(personality, source)
+            for i in indexes:
+                results[i] = self._batch_result(messages[i], response, source)
+        
+        deadline = time.monotonic() + self.model_timeout
+        for key, future in futures.items():
+            message = messages[pending[key][0]].strip()
+            error = None
+            try:
+                response = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                future.cancel()
+                response, error = None, f"Model timeout after {self.model_timeout}s"
+            except Exception as e:
+                print(f"Gemini API Error: {e}")
+                response, error = None, str(e)
+            
             if response:
-                return response
+                source = 'model'
+                self._cache_set(key, response)
+            else:
+                if error:
+                    self._count(personality, 'model_failure')
+                source, response = 'fallback', self._fallback_response(message, personality)
+            self._count(personality, source)
+            for i in pending[key]:
+                results[i] = self._batch_result(messages[i], response, source, error)
+        
+        return results
+    
+    def _batch_result(self, message, response, source, error=None):
+        """One entry of a get_responses result"""
+        return {
+            'message': message,
+            'success': response is not None,
+            'response': response,
+            'source': source,
+            'error': error,
+        }
+    
+    def stream_response(self, user_message, personality='friendly', session_id=None):
+        """Yield response chunks as Gemini generates them
+        
+        Falls back to the knowledge base answer as a single chunk when no
+        model is available or the model fails before producing any text.
+        """
+        for chunk, _ in self.stream_response_with_source(user_message, personality, session_id):
+            yield chunk
+    
+    def stream_response_with_source(self, user_message, personality='friendly', session_id=None):
+        """Like stream_response, but yields (chunk, source) pairs
+        
+        The source is where the chunk came from: 'snapshot', 'cache', 'model'
+        or 'fallback'.
+        """
+        for chunk, source, _ in self.stream_response_with_usage(user_message, personality, session_id):
+            yield chunk, source
+    
+    def stream_response_with_usage(self, user_message, personality='friendly', session_id=None):
+        """Like stream_response_with_source, but yields (chunk, source, usage)
+        
+        usage is the prompt estimate for chunks streamed from the model and
+        None for the others, as in get_response_with_usage.
+        """
+        history = self._session_history(session_id)
+        chunks = []
+        for chunk, source, usage in self._stream_response(user_message, personality, history):
+            chunks.append(chunk)
+            yield chunk, source, usage
+        self._remember(session_id, user_message, ''.join(chunks).strip())
+    
+    def _stream_response(self, user_message, personality, history):
+        cache_key = self._cache_key(user_message, personality, history)
+        precomputed = self._snapshot_get(cache_key)
+        if precomputed is not None:
+            self._count(personality, 'snapshot')
+            yield precomputed, 'snapshot', None
+            return
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            self._count(personality, 'cache')
+            yield cached, 'cache', None
+            return
+        
+        streamed = []
+        if self._model_available():
+            start = time.perf_counter()
+            usage = self._prompt_usage(user_message, personality, history)
+            # Styles chunks as they arrive, holding back words that may continue
+            formatter = self._formatter(personality).stream()
+            try:
+                chunks = self.provider.stream(
+                    self._build_prompt(user_message, personality, history),
+                    self._generation_config(personality)
+                )
+                for text in chunks:
+                    text = formatter.feed(text) if text else text
+                    if text:
+                        streamed.append(text)
+                        yield text, 'model', usage
+                text = formatter.finish()
+                if text:
+                    streamed.append(text)
+                    yield text, 'model', usage
+                self._record_model_call(True)
+            except Exception as e:
+                print(f"Gemini API Error: {e}")
+                self._record_model_call(False)
+                self._count(personality, 'model_failure')
+                # Text already sent to the client cannot be taken back
+                if streamed:
+                    text = formatter.finish()
+                    if text:
+                        yield text, 'model', usage
+                    return
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, 'model_stream')
+            
+            # Only complete answers are cached
+            if streamed:
+                self._count(personality, 'model')
+                self._cache_set(cache_key, ''.join(streamed).strip())
+        
+        if not streamed:
+            self._count(personality, 'fallback')
+            yield self._fallback_response(user_message, personality), 'fallback', None
+    
+    def _count(self, personality, source):
+        """Count a response by personality and where it came from"""
+        label = personality if personality in self.personality_styles else 'other'
+        MODEL_RESPONSES.inc(label, source)
+    
+    def _session_history(self, session_id):
+        """Earlier (role, text) turns of a conversation"""
+        if session_id is None or self.session_store is None:
+            return []
+        return self.session_store.history(session_id)
+    
+    def _remember(self, session_id, user_message, response):
+        """Record a finished exchange in the session store"""
+        if session_id is None or self.session_store is None or not response:
+            return
+        self.session_store.append(session_id, user_message, response)
+    
+    def _cache_key(self, user_message, personality, history=None):
+        """Response cache key for a message and personality tone"""
+        # Answers that depend on earlier turns are not cached
+        if history:
+            return None
+        tone = self.personality_styles.get(personality, self.personality_styles['friendly'])['tone']
+        return ResponseCache.make_key(user_message, tone)
+    
+    def _cache_get(self, key):
+        """Look up a cached response, ignoring cache backend errors"""
+        if self.response_cache is None or key is None:
+            return None
+        try:
+            with STAGE_SECONDS.time('cache_lookup'):
+                return self.response_cache.get(key)
+        except Exception as e:
+            print(f"Cache Error: {e}")
+            return None
+    
+    def _snapshot_get(self, key):
+        """Look up a precomputed answer, ignoring snapshot errors"""
+        if self.answer_snapshot is None or key is None:
+            return None
+        try:
+            with STAGE_SECONDS.time('snapshot_lookup'):
+                return self.answer_snapshot.get(key)
+        except Exception as e:
+            print(f"Snapshot Error: {e}")
+            return None
+    
+    def _cache_set(self, key, response):
+        """Store a model response, ignoring cache backend errors"""
+        if self.response_cache is None or key is None:
+            return
+        try:
+            self.response_cache.set(key, response)
+        except Exception as e:
+            print(f"Cache Error: {e}")
+    
+    def _build_prompt(self, user_message, personality, history=None):
+        """Build the Gemini prompt for a message and personality"""
+        with STAGE_SECONDS.time('prompt_build'):
+            return self.prompt_builder.build(user_message, personality, history)
+    
+    def _fallback_response(self, user_message, personality='friendly'):
+        """Fallback response using knowledge base"""
+        with STAGE_SECONDS.time('fallback_match'):
+            response = self._knowledge_base_response(user_message, personality)
+        return self._format_with_personality(response, personality)
+    
+    def _knowledge_base_response(self, user_message, personality):
+        """Route a message through the compiled knowledge base"""
+        kb = self._current_kb()
+        matches = kb.search(user_message)
         
-        # Check for career topics
-        if self._matches_keywords(user_message_lower, self.knowledge_base['career']['keywords']):
-            response = self._get_specific_response(user_message_lower, self.knowledge_base['career']['responses'])
+        # Intent answers, specific topics before generic templates
+        smart_response = self._generate_smart_response(user_message, matches, kb=kb)
+        if smart_response:
+            return smart_response
+        
+        # Check knowledge base categories in order (greetings, programming, AI/ML, web, career)
+        matched = [category for category in kb.categories if ('category', category) in matches]
+        for category in matched:
+            entry = kb.categories[category]
+            if isinstance(entry['responses'], tuple):
+                return self._get_random_response(entry['responses'])
+            response = self._get_specific_response(matches, category, kb)
             if response:
                 return response
+        # A category keyword without any of its topics, e.g. "react hooks"
+        if matched:
+            return self._get_random_response(kb.category_answers[matched[0]])
+        
+        # The most similar answer, for messages no keyword matched
+        retrieved = self._retrieve_batch([user_message], kb)[0]
+        if retrieved:
+            return retrieved
         
         # Default response for unknown topics
-        default_response = self._generate_default_response(user_message, personality)
+        default_response = self._generate_default_response(user_message, personality, kb)
         return default_response
     
-    def _matches_keywords(self, text, keywords):
-        """Check if text contains any keywords"""
-        return any(keyword in text for keyword in keywords)
+    def _retrieve_batch(self, messages, kb):
+        """Most similar knowledge base answer per message, or None below the threshold"""
+        import random
+        
+        if not messages:
+            return []
+        with STAGE_SECONDS.time('retrieval'):
+            hits = kb.retriever.search_batch(messages, self.retrieval_threshold)
+        return [
+            render(random.choice(hit[0]), message) if hit else None
+            for message, hit in zip(messages, hits)
+        ]
     
     def _get_random_response(self, responses):
         """Get random response from list"""
         import random
         return random.choice(responses)
     
-    def _get_specific_response(self, user_message, responses_dict):
+    def _get_specific_response(self, matches, category, kb):
         """Get specific response based on detailed keywords"""
         import random
         
-        # First try exact matches
-        for key, content in responses_dict.items():
-            if isinstance(content, list) and any(keyword in user_message for keyword in [key]):
-                return random.choice(content)
-            elif isinstance(content, dict):
-                for sub_key, sub_content in content.items():
-                    if isinstance(sub_content, list) and sub_key in user_message:
-                        return random.choice(sub_content)
-        
-        # If no exact match, try partial matches
-        for key, content in responses_dict.items():
-            if isinstance(content, list):
-                for keyword in key.split():
-                    if len(keyword) > 2 and keyword in user_message:
-                        return random.choice(content)
-            elif isinstance(content, dict):
-                for sub_key, sub_content in content.items():
-                    if isinstance(sub_content, list):
-                        for keyword in sub_key.split():
-                            if len(keyword) > 2 and keyword in user_message:
-                                return random.choice(sub_content)
+        # First try exact matches, then partial (split-word) matches
+        topics = kb.category_topics[category]
+        for kind in ('topic', 'partial'):
+            for path, responses in topics:
+                if (kind, category, path) in matches:
+                    return random.choice(responses)
         
         return None
     
-    def _generate_smart_response(self, user_message):
-        """Generate smart response using keyword extraction and context"""
-        import random
+    def _generate_smart_response(self, user_message, matches=None, specific_only=False, kb=None):
+        """Generate smart response using keyword extraction and context
         
-        message_lower = user_message.lower()
-        
-        # Detect intent and context
-        if any(word in message_lower for word in ['kaise', 'how', 'sikhun', 'learn', 'seekhun', 'samajhun']):
-            # Learning intent
-            if 'python' in message_lower:
-                steps = [
-                    "Python seekhne ke steps:\n1. Basics (variables, loops, functions) sikho\n2. OOPS concepts samajho\n3. Libraries use karna seekho (NumPy, Pandas)\n4. Real projects banao\n5. Practice karte raho!",
-                    "Python roadmap:\n→ Fundamentals (syntax, data types)\n→ Functions aur modules\n→ OOP concepts\n→ File handling aur exceptions\n→ Libraries (Requests, BeautifulSoup)\n→ Projects banao!",
-                ]
-                return random.choice(steps)
-            elif 'javascript' in message_lower:
-                return "JavaScript sikho:\n1. Basics (variables, operators, loops)\n2. DOM manipulation\n3. ES6+ features (arrow functions, classes)\n4. Async/Await\n5. React/Vue frameworks\n6. Build projects!"
-            elif 'web' in message_lower:
-                return "Web development ka path:\n1. HTML/CSS fundamentals\n2. JavaScript (vanilla)\n3. Frontend frameworks (React)\n4. Backend (Node.js, Python)\n5. Databases (MongoDB, PostgreSQL)\n6. Deploy karo!"
-            else:
-                return f"'{user_message}' sikkhne ke liye:\n1. Fundamentals samajho\n2. Online resources/tutorials dekho\n3. Practice problems karo\n4. Real projects banao\n5. Community mein engage raho\n6. Constantly improve karo!"
-        
-        elif any(word in message_lower for word in ['kya', 'what', 'explain', 'define']):
-            # Definition/explanation intent
-            if 'machine learning' in message_lower or 'ml' in message_lower:
-                return "Machine Learning kya hai?\nMachine Learning = Programs jo data se learn karte hain aur predictions karte hain!\n\nTypes:\n• Supervised Learning (labeled data)\n• Unsupervised Learning (unlabeled data)\n• Reinforcement Learning (trial-error)\n\nCommon algorithms: Linear Regression, Decision Trees, Neural Networks"
-            elif 'api' in message_lower:
-                return "API (Application Programming Interface) kya hai?\nAPI = ek interface jo alag-alag applications ko communicate karne deta hai!\n\nExample:\nWeather app → Weather API → Weather data\n\nTypes: REST, GraphQL, SOAP\nUse: Data exchange, third-party integration"
-            elif 'database' in message_lower or 'sql' in message_lower:
-                return "Database kya hai?\nDatabase = organized data ka collection!\n\nTypes:\n• Relational (SQL) - Tables\n• NoSQL - Documents, Key-Value\n• Graph - Relationships\n\nPopular: MySQL, PostgreSQL, MongoDB, Firebase"
-            else:
-                return f"'{user_message}' ke baare mein basic jaankari:\n\nMain concepts:\n→ Definition aur purpose\n→ Kaise kaam karta hai\n→ Use cases\n→ Benefits aur drawbacks\n→ Real world examples\n\nKya aap more specific detail chaahte ho?"
+        Intents are checked in knowledge base order. An answer for a matched
+        topic wins over the generic template of an earlier intent, so "ML kya
+        hai" gets the definition even though "kya" and "learn" both match.
+        With specific_only, returns None instead of a generic template.
+        Returns None when no intent matched.
+        """
+        import random
         
-        elif any(word in message_lower for word in ['salary', 'job', 'career', 'work', 'company']):
-            return "Tech Career Guide:\n\n1. Entry Level: Intern/Junior Dev\n   → 2-5 LPA (India)\n   → Learn karte raho\n   \n2. Mid Level: Senior Dev (3-5 yrs)\n   → 8-15 LPA\n   → Leadership seekho\n   \n3. Senior: Tech Lead (5+ yrs)\n   → 15-30+ LPA\n   → Architecture decide karo\n\nTips: Portfolio banao, GitHub contribute karo, networking karo!"
+        if kb is None:
+            kb = self._current_kb()
+        if matches is None:
+            matches = kb.search(user_message)
         
-        elif any(word in message_lower for word in ['hello', 'hi', 'hii', 'hey', 'namaste', 'salaam']):
-            greetings = [
-                f"Namaste! Welcome to your AI chatbot! 🚀 Kya main aapki help kar sakta hoon?",
-                f"Hey there! Main tech topics mein expert hoon! Pooch lo anything about Python, Web Dev, ML, etc.",
-                f"Shukriya! Mujhe khushi hui aapse milkar! Tech-related koi bhi sawaal poocho! 💻"
-            ]
-            return random.choice(greetings)
+        # Detect intent and context, in knowledge base order
+        generic = None
+        for intent in kb.intents:
+            if ('intent', intent.name) not in matches:
+                continue
+            for words, responses in intent.topics:
+                if any(('word', word) in matches for word in words):
+                    return render(random.choice(responses), user_message)
+            if not intent.generic:
+                return render(random.choice(intent.responses), user_message)
+            if generic is None:
+                generic = intent
         
-        else:
-            # Generic smart response
-            return f"'{user_message}' - Interesting question! 🤔\n\nMain topics mein madad kar sakta hoon:\n• Programming (Python, JavaScript)\n• Web Development\n• Machine Learning & AI\n• Data Science\n• Career guidance\n\nKya koi specific topic explore karna chaahte ho?"
+        if generic is None or specific_only:
+            return None
+        return render(random.choice(generic.responses), user_message)
     
-    def _generate_default_response(self, user_message, personality):
+    def _generate_default_response(self, user_message, personality, kb=None):
         """Generate default response for unknown topics"""
         import random
         
-        # Try smart response generation first
-        smart_response = self._generate_smart_response(user_message)
-        if smart_response:
-            return smart_response
-        
-        # Fallback default responses
-        default_responses = [
-            f"Acha, tum pucha: '{user_message}' - Ye bahut interesting sawal hai! 🤔 Kya tum aur details de sakte ho?",
-            f"Ye topic ke baare mein main poora jankari rakhta hoon! 📚 Agar aap Python, JavaScript, Machine Learning ya Web Development ke baare mein poochte ho toh main aur help kar sakta hoon.",
-            f"Mujhe lagta hai ye ek bahut accha sawal hai! 💡 Kya aap kisi specific tech topic ke baare mein seekhna chahte ho?",
-            "Interesting! Agar koi tech-related sawal hai toh main bilkul madad kar sakta hoon! 🚀",
-            f"'{user_message}' - Ye ek creative question hai! Tech ke field mein bohot scope hai. Specific topics mein mujhe help lene ke liye pooch! 💻"
-        ]
-        return random.choice(default_responses)
+        kb = kb or self._current_kb()
+        return render(random.choice(kb.unknown_responses), user_message)
+    
+    def _formatter(self, personality):
+        return self.formatters.get(personality, self.formatters['friendly'])
     
     def _format_with_personality(self, response, personality):
         """Format response according to personality"""
-        style = self.personality_styles.get(personality, self.personality_styles['friendly'])
-        
-        if personality == 'professional':
-            # Remove emojis for professional tone
-            response = re.sub(r'[😊🤖💪🤔📚💡🚀👋]', '', response)
-        elif personality == 'formal':
-            # Remove casual language and emojis
-            response = re.sub(r'[😊🤖💪🤔📚💡🚀👋✨]', '', response)
-            response = response.replace('Acha,', 'Well,').replace('tum', 'you')
-        elif personality == 'creative':
-            # Add more emojis and creative language
-            response = style['prefix'] + response
-        
-        return response.strip()
+        return self._formatter(personality).format(response)
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Numeric state for the metrics gauge
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream so requests fail fast to the fallback
+
+    Closed: every call goes through. The breaker opens after
+    ``failure_threshold`` consecutive failures, or when at least
+    ``min_calls`` of the last ``window`` calls were recorded and their
+    failure share reaches ``error_rate``.
+
+    Open: calls are refused for ``reset_timeout`` seconds, then the breaker
+    turns half-open.
+
+    Half-open: at most ``half_open_max_calls`` probe calls are let through
+    at a time. ``success_threshold`` successful probes close the breaker and
+    any failure opens it again. A probe whose outcome is never recorded
+    frees its slot after ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, error_rate=0.5, window=20, min_calls=10,
+                 reset_timeout=30.0, half_open_max_calls=1, success_threshold=1, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.success_threshold = success_threshold
+        self.opens = 0
+        self.rejected = 0
+        self._clock = clock
+        self._results = deque(maxlen=window)
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes = deque()
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def allow_request(self):
+        """Whether a call may go to the upstream now; every True needs a record_* call"""
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN:
+                while self._probes and now - self._probes[0] >= self.reset_timeout:
+                    self._probes.popleft()
+                if len(self._probes) < self.half_open_max_calls:
+                    self._probes.append(now)
+                    return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            state = self._current_state(self._clock())
+            if state == HALF_OPEN:
+                if self._probes:
+                    self._probes.popleft()
+                self._probe_successes += 1
+                if self._probe_successes >= self.success_threshold:
+                    self._close()
+            elif state == CLOSED:
+                self._consecutive_failures = 0
+                self._record(False)
+
+    def record_failure(self):
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._open(now)
+            elif state == CLOSED:
+                self._consecutive_failures += 1
+                self._record(True)
+                if self._consecutive_failures >= self.failure_threshold or self._error_rate_exceeded():
+                    self._open(now)
+
+    def reset(self):
+        """Close the breaker and forget recorded calls"""
+        with self._lock:
+            self._close()
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            calls = len(self._results)
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'recent_calls': calls,
+                'recent_error_rate': round(self._failures / calls, 4) if calls else 0.0,
+                'opens': self.opens,
+                'rejected': self.rejected,
+                'retry_in': round(max(0.0, self._opened_at + self.reset_timeout - now), 3) if state == OPEN else None,
+            }
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes.clear()
+            self._probe_successes = 0
+        return self._state
+
+    def _record(self, failed):
+        if len(self._results) == self._results.maxlen and self._results[0]:
+            self._failures -= 1
+        self._results.append(failed)
+        self._failures += failed
+
+    def _error_rate_exceeded(self):
+        calls = len(self._results)
+        return calls >= self.min_calls and self._failures / calls >= self.error_rate
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self.opens += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._opened_at = None
+        self._results.clear()
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._probes.clear()
+        self._probe_successes = 0
+
+
+def create_circuit_breaker():
+    """Build the circuit breaker configured through environment variables
+
+    CHATBOT_BREAKER: 'on' (default) or 'off'
+    CHATBOT_BREAKER_FAILURES: consecutive failures that open it (default 5)
+    CHATBOT_BREAKER_ERROR_RATE: failure share of recent calls that opens it (default 0.5)
+    CHATBOT_BREAKER_WINDOW: recent calls considered for the error rate (default 20)
+    CHATBOT_BREAKER_MIN_CALLS: calls needed before the error rate applies (default 10)
+    CHATBOT_BREAKER_RESET: seconds open before probing again (default 30)
+    CHATBOT_BREAKER_PROBES: concurrent probe calls while half-open (default 1)
+    """
+    if os.getenv('CHATBOT_BREAKER', 'on').lower() == 'off':
+        return None
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv('CHATBOT_BREAKER_FAILURES', '5')),
+        error_rate=float(os.getenv('CHATBOT_BREAKER_ERROR_RATE', '0.5')),
+        window=int(os.getenv('CHATBOT_BREAKER_WINDOW', '20')),
+        min_calls=int(os.getenv('CHATBOT_BREAKER_MIN_CALLS', '10')),
+        reset_timeout=float(os.getenv('CHATBOT_BREAKER_RESET', '30')),
+        half_open_max_calls=int(os.getenv('CHATBOT_BREAKER_PROBES', '1')),
+    )
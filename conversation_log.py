@@ -0,0 +1,190 @@
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+
+class ConversationLogger:
+    """Appends one JSON line per answered message without slowing requests down
+
+    ``log`` only puts the record on a bounded queue; a background writer
+    thread serializes records and writes them in batches of up to
+    ``batch_size``, at least every ``flush_interval`` seconds. When the
+    queue is full the record is dropped and counted instead of making the
+    request wait for the disk. Once the file reaches ``max_bytes`` it is
+    rotated to ``<path>.1.gz`` (older files shift up, at most ``backups``
+    are kept). A ``{pid}`` in the path gives every worker process its own
+    file, so forked workers never rotate a file another one is writing.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5, queue_size=10000,
+                 batch_size=256, flush_interval=1.0):
+        self.path_template = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.after_fork()
+
+    @property
+    def path(self):
+        return self.path_template.format(pid=os.getpid())
+
+    def per_process(self):
+        """Give every process its own file when the path has no ``{pid}``
+
+        ``logs/chat.jsonl`` becomes ``logs/chat.{pid}.jsonl``. Returns True
+        when the path was changed.
+        """
+        if '{pid}' in self.path_template:
+            return False
+        root, ext = os.path.splitext(self.path_template)
+        self.path_template = root + '.{pid}' + ext
+        return True
+
+    def after_fork(self):
+        """Start over with a fresh queue; the writer thread does not survive fork"""
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.rotations = 0
+        self._queue = queue.Queue(self.queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def log(self, message, personality, source, latency, **fields):
+        """Queue a record; returns False when it was dropped"""
+        if self._closed:
+            return False
+        if self._thread is None:
+            self._start()
+        record = {
+            'time': datetime.now().isoformat(),
+            'message': message,
+            'personality': personality,
+            'source': source,
+            'latency_ms': round(latency * 1000, 3),
+        }
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued record is written; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            thread.join(timeout)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'rotations': self.rotations,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name='conversation-log', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            stopping = len(records) < len(batch)
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                print(f"Conversation Log Error: {e}")
+                self.errors += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, records):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        path = self.path
+        with open(path, 'ab') as f:
+            f.write(data)
+            size = f.tell()
+        self.written += len(records)
+        if size >= self.max_bytes:
+            self._rotate(path)
+
+    def _rotate(self, path):
+        """Shift <path>.N.gz up by one and compress the full file to <path>.1.gz"""
+        if self.backups <= 0:
+            os.remove(path)
+            self.rotations += 1
+            return
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{path}.{index}.gz'
+            if os.path.exists(source):
+                os.replace(source, f'{path}.{index + 1}.gz')
+        # Move the file aside first so new records start a fresh file
+        pending = f'{path}.1'
+        os.replace(path, pending)
+        with open(pending, 'rb') as src, gzip.open(f'{path}.1.gz.tmp', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(f'{path}.1.gz.tmp', f'{path}.1.gz')
+        os.remove(pending)
+        self.rotations += 1
+
+
+def create_conversation_logger():
+    """Build the conversation logger configured through environment variables
+
+    CHATBOT_LOG_PATH: JSONL file to write; logging is off when unset. May contain {pid}
+    CHATBOT_LOG_MAX_MB: size at which the file is rotated and compressed (default 50)
+    CHATBOT_LOG_BACKUPS: compressed files kept (default 5)
+    CHATBOT_LOG_QUEUE: records waiting to be written before new ones are dropped (default 10000)
+    """
+    path = os.getenv('CHATBOT_LOG_PATH')
+    if not path:
+        return None
+    return ConversationLogger(
+        path,
+        max_bytes=int(float(os.getenv('CHATBOT_LOG_MAX_MB', '50')) * 1024 * 1024),
+        backups=int(os.getenv('CHATBOT_LOG_BACKUPS', '5')),
+        queue_size=int(os.getenv('CHATBOT_LOG_QUEUE', '10000')),
+    )
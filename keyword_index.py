@@ -0,0 +1,95 @@
+from collections import deque
+
+
+class KeywordIndex:
+    """Aho-Corasick automaton for matching many keywords in one pass
+
+    Keywords are matched as plain substrings (the same semantics as
+    ``keyword in text``), overlapping matches included. Each keyword carries
+    one or more tags and ``search`` returns every tag whose keyword occurs
+    in the text, so the cost of a lookup depends on the length of the
+    message and not on the size of the vocabulary.
+    """
+
+    def __init__(self, entries=None):
+        self._goto = [{}]
+        self._fail = [0]
+        # Tags of the keywords ending at each state, and those plus the tags
+        # inherited through failure links (filled in by build)
+        self._own = [()]
+        self._out = [()]
+        self._built = False
+        self._size = 0
+        if entries:
+            for keyword, tag in entries:
+                self.add(keyword, tag)
+            self.build()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, keyword, tag):
+        """Register a keyword with a tag returned when it matches"""
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+                self._out.append(())
+            state = next_state
+        if tag not in self._own[state]:
+            self._own[state] = self._own[state] + (tag,)
+            self._size += 1
+        self._built = False
+
+    def build(self):
+        """Compute failure links so the automaton can be searched
+
+        Outputs are recomputed from the registered keywords, so keywords may
+        be added and the index rebuilt any number of times.
+        """
+        self._out = list(self._own)
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches of the longest proper suffix
+                if self._out[self._fail[next_state]]:
+                    self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        self._built = True
+        return self
+
+    def search(self, text):
+        """Return the set of tags for every keyword found in text"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
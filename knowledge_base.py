@@ -0,0 +1,209 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+from keyword_index import KeywordIndex
+from retrieval import Retriever
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')
+
+# Placeholder replaced with the user's message in response templates
+MESSAGE_PLACEHOLDER = '{message}'
+
+
+def render(response, user_message):
+    """Fill a compiled response with the user's message"""
+    if isinstance(response, tuple):
+        return user_message.join(response)
+    return response
+
+
+class Intent:
+    """Compiled intent: trigger words, topic-specific answers and a default answer"""
+
+    __slots__ = ('name', 'words', 'topics', 'responses', 'generic')
+
+    def __init__(self, name, words, topics, responses, generic):
+        self.name = name
+        self.words = words
+        self.topics = topics
+        self.responses = responses
+        self.generic = generic
+
+
+class KnowledgeBase:
+    """Knowledge base compiled from a JSON data file into lookup tables
+
+    Every keyword, intent word and topic word goes into one KeywordIndex.
+    Response strings are interned into tuples, and templates are pre-split
+    around ``{message}``, so answering a request needs no per-request
+    rebuilding. Instances are immutable once built; reloading creates a new
+    instance that callers swap in atomically.
+    """
+
+    def __init__(self, data, source=None, mtime=None):
+        self.source = source
+        self.mtime = mtime
+        self.loaded_at = datetime.now().isoformat()
+
+        try:
+            self.categories = {
+                _intern(name): self._compile_category(entry)
+                for name, entry in data['categories'].items()
+            }
+            self.intents = tuple(self._compile_intent(entry) for entry in data.get('intents', []))
+            self.unknown_responses = _responses(data['unknown_responses'])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid knowledge base {source or ''}: {e!r}") from e
+
+        # Topics of each category in routing order: (path, responses)
+        self.category_topics = {
+            name: tuple(_topics(entry['responses']))
+            for name, entry in self.categories.items()
+        }
+        # Every answer of each category, for messages that name none of its topics
+        self.category_answers = {
+            name: entry['responses'] if isinstance(entry['responses'], tuple)
+            else tuple(response for _, responses in self.category_topics[name] for response in responses)
+            for name, entry in self.categories.items()
+        }
+        self.index = self._build_index()
+        self.retriever = Retriever(self._retrieval_documents())
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Read and compile a knowledge base data file"""
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data, path, mtime)
+
+    def search(self, text):
+        """Return every intent, topic and category tag found in text"""
+        return self.index.search(text.lower())
+
+    def stats(self):
+        return {
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'categories': len(self.categories),
+            'topics': sum(len(topics) for topics in self.category_topics.values()),
+            'intents': len(self.intents),
+            'keywords': len(self.index),
+        }
+
+    def _compile_category(self, entry):
+        responses = entry['responses']
+        if isinstance(responses, dict):
+            responses = {
+                _intern(key): _responses(content) if isinstance(content, list) else {
+                    _intern(sub_key): _responses(sub_content)
+                    for sub_key, sub_content in content.items()
+                    if isinstance(sub_content, list)
+                }
+                for key, content in responses.items()
+            }
+        else:
+            responses = _responses(responses)
+        return {
+            'keywords': tuple(_intern(keyword.lower()) for keyword in entry['keywords']),
+            'responses': responses,
+        }
+
+    def _compile_intent(self, entry):
+        return Intent(
+            name=_intern(entry['name']),
+            words=tuple(_intern(word.lower()) for word in entry['words']),
+            topics=tuple(
+                (tuple(_intern(word.lower()) for word in topic['words']), _responses(topic['responses']))
+                for topic in entry.get('topics', [])
+            ),
+            responses=_responses(entry['responses']),
+            generic=bool(entry.get('generic', True)),
+        )
+
+    def _build_index(self):
+        """Compile intent words and knowledge base keywords into one automaton"""
+        index = KeywordIndex()
+        for intent in self.intents:
+            for word in intent.words:
+                index.add(word, ('intent', intent.name))
+            for words, _ in intent.topics:
+                for word in words:
+                    index.add(word, ('word', word))
+
+        for category, entry in self.categories.items():
+            for keyword in entry['keywords']:
+                index.add(keyword, ('category', category))
+            for path, _ in self.category_topics[category]:
+                # Exact topic matches and split-word partial matches
+                topic = path[-1].lower()
+                index.add(topic, ('topic', category, path))
+                for word in topic.split():
+                    if len(word) > 2:
+                        index.add(word, ('partial', category, path))
+
+        return index.build()
+
+    def _retrieval_documents(self):
+        """(text, responses) pairs for similarity search
+
+        Trigger words and each individual answer are separate documents
+        pointing at the same answer list, so a short question is not diluted
+        by long answers. Generic intent answers are templates that fit any
+        question, so they are left out.
+        """
+        groups = []
+        for category, entry in self.categories.items():
+            topics = self.category_topics[category]
+            if isinstance(entry['responses'], tuple):
+                groups.append((entry['keywords'], entry['responses']))
+            else:
+                # Category keywords with each topic, so a message naming only
+                # a keyword still finds the category and a topic word picks the topic
+                groups.extend((entry['keywords'] + path, responses) for path, responses in topics)
+            groups.extend(topics)
+        for intent in self.intents:
+            groups.extend(intent.topics)
+            if not intent.generic:
+                groups.append((intent.words, intent.responses))
+
+        documents = []
+        for words, responses in groups:
+            documents.append((' '.join(words), responses))
+            for response in responses:
+                documents.append((' '.join(response) if isinstance(response, tuple) else response, responses))
+        return documents
+
+
+def _intern(text):
+    if not isinstance(text, str):
+        raise TypeError(f"expected a string, got {text!r}")
+    return sys.intern(text)
+
+
+def _responses(items):
+    """Intern a list of responses, pre-splitting templates around the placeholder"""
+    if not isinstance(items, list) or not items:
+        raise TypeError(f"expected a non-empty list of responses, got {items!r}")
+    compiled = []
+    for text in items:
+        text = _intern(text)
+        if MESSAGE_PLACEHOLDER in text:
+            compiled.append(tuple(_intern(part) for part in text.split(MESSAGE_PLACEHOLDER)))
+        else:
+            compiled.append(text)
+    return tuple(compiled)
+
+
+def _topics(responses):
+    """Yield (path, responses) for every answer list of a category"""
+    if not isinstance(responses, dict):
+        return
+    for key, content in responses.items():
+        if isinstance(content, tuple):
+            yield (key,), content
+        else:
+            for sub_key, sub_content in content.items():
+                yield (key, sub_key), sub_content
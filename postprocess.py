@@ -0,0 +1,122 @@
+import re
+
+# Emoji and the invisible characters that join or style them, as one class
+EMOJI_RANGES = (
+    '\U0001F000-\U0001FAFF'   # cards, enclosed letters, flags, pictographs, emoticons, skin tones
+    '\u2600-\u27BF'           # miscellaneous symbols and dingbats (sun, sparkles, check mark)
+    '\u2B00-\u2BFF'           # stars and arrows drawn as emoji
+    '\u2300-\u23FF'           # watches, hourglasses, media buttons
+    '\u3030\u303D\u3297\u3299'
+    '\uFE0E\uFE0F\u200D\u20E3'  # presentation selectors, zero-width joiner, keycap
+    '\U000E0020-\U000E007F'   # tags of subdivision flags
+)
+# An emoji run; the text around it is left as it is
+EMOJI_PATTERN = f'[{EMOJI_RANGES}]+'
+
+# Casual Hinglish turned formal, replaced wherever they occur; phrases must
+# not contain whitespace
+FORMAL_SUBSTITUTIONS = {
+    'Acha,': 'Well,',
+    'tum': 'you',
+}
+
+WHITESPACE = ' \t\r\n'
+# Text held back without any whitespace before it is processed anyway
+MAX_HELD = 1024
+
+
+class ResponseFormatter:
+    """Personality styling compiled into a single regex pass
+
+    Emoji removal and word substitutions are alternatives of one pattern, so
+    styling a response walks it once. ``prefix`` is put in front of every
+    non-empty response. ``stream()`` applies the same styling to text that
+    arrives in chunks.
+    """
+
+    def __init__(self, prefix='', strip_emoji=False, substitutions=None):
+        self.prefix = prefix
+        self.substitutions = dict(substitutions or {})
+        alternatives = [re.escape(phrase) for phrase in sorted(self.substitutions, key=len, reverse=True)]
+        leading = ''.join(sorted({re.escape(phrase[0]) for phrase in self.substitutions}))
+        if strip_emoji:
+            alternatives.append(EMOJI_PATTERN)
+            leading += EMOJI_RANGES
+        # The lookahead rejects most positions with one character class test
+        # before any alternative is tried
+        self.pattern = re.compile(f"(?=[{leading}])(?:{'|'.join(alternatives)})") if alternatives else None
+
+    def format(self, text):
+        """Styled copy of a whole response"""
+        text = self._apply(text).strip()
+        return self.prefix + text if text else text
+
+    def stream(self):
+        return StreamFormatter(self)
+
+    def _apply(self, text):
+        if self.pattern is None:
+            return text
+        # Emoji runs are not in the table and are dropped
+        return self.pattern.sub(lambda match: self.substitutions.get(match.group(), ''), text)
+
+
+class StreamFormatter:
+    """Styles a response chunk by chunk
+
+    ``feed`` returns the styled text that is safe to send so far and
+    ``finish`` the rest. Text after the last whitespace is held back, since
+    a word or emoji sequence may continue in the next chunk; no pattern
+    spans whitespace, so styling the text up to it can never change later.
+    Trailing whitespace is held as well, so the joined output equals
+    ``format`` of the joined input.
+    """
+
+    def __init__(self, formatter):
+        self.formatter = formatter
+        self._held = ''
+        self._space = ''
+        self._started = False
+
+    def feed(self, chunk):
+        text = self._held + chunk
+        if self.formatter.pattern is None:
+            self._held = ''
+            return self._emit(text)
+        cut = max(text.rfind(c) for c in WHITESPACE) + 1
+        if not cut and len(text) > MAX_HELD:
+            cut = len(text)
+        self._held = text[cut:]
+        return self._emit(self.formatter._apply(text[:cut]))
+
+    def finish(self):
+        text = self._emit(self.formatter._apply(self._held))
+        self._held = ''
+        self._space = ''
+        return text
+
+    def _emit(self, text):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ''
+            self._started = True
+            text = self.formatter.prefix + text
+        body = text.rstrip()
+        if not body:
+            self._space += text
+            return ''
+        text, self._space = self._space + body, text[len(body):]
+        return text
+
+
+def build_formatters(personality_styles):
+    """One compiled formatter per personality, from the styles' formatting options"""
+    return {
+        name: ResponseFormatter(
+            prefix=style['prefix'] if style.get('decorate') else '',
+            strip_emoji=style.get('strip_emoji', False),
+            substitutions=style.get('substitutions'),
+        )
+        for name, style in personality_styles.items()
+    }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Precompute answers to popular questions into a memory-mapped snapshot
+
+    python precompute.py --output answers.snapshot
+    python precompute.py --log logs/chat-*.jsonl --top 200 --output answers.snapshot
+    python precompute.py --url http://127.0.0.1:5000 --output answers.snapshot
+
+Questions come from /api/suggestions (of the in-process app, or of the
+server at --url) and from the most frequent messages in conversation log
+files. Every question is answered by ChatbotEngine once per personality,
+and the answers are written to a snapshot that replaces the old file
+atomically; workers started with CHATBOT_SNAPSHOT_PATH pointing at it pick
+the new file up without a restart.
+
+Only model answers are kept by default: knowledge base answers are cheap to
+compute at request time and would otherwise freeze one of their random
+variants. Pass --include-fallback to keep them too.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_snapshot import write_snapshot
+
+# Sources whose answers are worth precomputing by default
+MODEL_SOURCES = ('model', 'cache')
+
+
+def suggested_questions(url=None):
+    """Questions listed by /api/suggestions"""
+    if url:
+        with urllib.request.urlopen(url.rstrip('/') + '/api/suggestions', timeout=30) as response:
+            return json.load(response)['suggestions']
+    from app import app
+    return app.test_client().get('/api/suggestions').json['suggestions']
+
+
+def logged_questions(paths, top):
+    """The ``top`` most frequent messages in conversation log files (plain or .gz)"""
+    counts = Counter()
+    first_seen = {}
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    message = json.loads(line)['message']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                normalized = ' '.join(message.lower().split())
+                if normalized:
+                    counts[normalized] += 1
+                    first_seen.setdefault(normalized, message.strip())
+    return [first_seen[normalized] for normalized, _ in counts.most_common(top)]
+
+
+def precompute(engine, questions, personalities, include_fallback=False, concurrency=8):
+    """Answer every question for every personality; returns ({key: answer}, source counts)
+
+    Questions go through get_response, the same path a live request takes,
+    so the snapshot holds what users would have been answered.
+    """
+    jobs = [(question, personality) for personality in personalities for question in questions]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = pool.map(lambda job: engine.get_response_with_source(*job), jobs)
+        answers = {}
+        sources = Counter()
+        for (question, personality), (response, source) in zip(jobs, results):
+            sources[source] += 1
+            if response and (include_fallback or source in MODEL_SOURCES):
+                answers[engine._cache_key(question, personality)] = response
+    return answers, sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=os.getenv('CHATBOT_SNAPSHOT_PATH', 'answers.snapshot'),
+                        help='snapshot file to write (default $CHATBOT_SNAPSHOT_PATH or answers.snapshot)')
+    parser.add_argument('--url', help='read suggestions from this server instead of the in-process app')
+    parser.add_argument('--log', nargs='*', default=[], help='conversation log files to mine for popular questions')
+    parser.add_argument('--top', type=int, default=100, help='most frequent logged questions to include')
+    parser.add_argument('--no-suggestions', action='store_true', help='skip /api/suggestions')
+    parser.add_argument('--personalities', help='comma-separated personalities (default all)')
+    parser.add_argument('--include-fallback', action='store_true', help='also keep knowledge base answers')
+    parser.add_argument('--concurrency', type=int, default=8, help='questions answered at once')
+    args = parser.parse_args()
+
+    from chatbot_engine import ChatbotEngine
+    engine = ChatbotEngine()
+    # Answer from the model, not from the snapshot being replaced
+    engine.answer_snapshot = None
+
+    questions = [] if args.no_suggestions else suggested_questions(args.url)
+    questions += logged_questions(args.log, args.top)
+    # Drop repeats, keeping the first spelling
+    unique = {}
+    for question in questions:
+        unique.setdefault(' '.join(question.lower().split()), question)
+    questions = list(unique.values())
+
+    personalities = args.personalities.split(',') if args.personalities else list(engine.personality_styles)
+    answers, sources = precompute(engine, questions, personalities, args.include_fallback, args.concurrency)
+    count = write_snapshot(args.output, answers)
+
+    print(f"{len(questions)} questions x {len(personalities)} personalities: "
+          + ', '.join(f"{source} {n}" for source, n in sorted(sources.items())))
+    print(f"Wrote {count} answers to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
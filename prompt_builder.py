@@ -0,0 +1,120 @@
+import os
+
+from session_store import MODEL, estimate_tokens
+
+# Instructions sent before the conversation; {tone} is filled per personality
+SYSTEM_TEMPLATE = """You are an expert tech assistant who specializes in programming, web development, machine learning, and AI.
+Your tone should be: {tone}
+Important instructions:
+- Respond in Hindi-English mix (Hinglish) style
+- Provide detailed, informative, and helpful answers
+- Give practical examples and tips when relevant
+- Be conversational but professional
+- Add relevant emojis based on the personality (3-4 max)
+- Keep responses clear and well-structured
+- If appropriate, break down complex topics into simple parts
+
+"""
+MESSAGE_PREFIX = "User message: "
+PROMPT_SUFFIX = "\n\nProvide a comprehensive and helpful response:"
+
+TRUNCATION_MARKER = ' [...]'
+CONVERSATION_HEADER = "Conversation so far:\n"
+ROLE_LABELS = {MODEL: 'Assistant: '}
+USER_LABEL = 'User: '
+
+
+class PromptTemplate:
+    """Prompt pieces and generation settings compiled for one personality"""
+
+    __slots__ = ('head', 'fixed_length', 'max_output_tokens', 'generation_config')
+
+    def __init__(self, tone, max_output_tokens, generation_config):
+        self.head = SYSTEM_TEMPLATE.format(tone=tone)
+        # Characters every prompt of this personality has besides the conversation and message
+        self.fixed_length = len(self.head) + len(MESSAGE_PREFIX) + len(PROMPT_SUFFIX)
+        self.max_output_tokens = max_output_tokens
+        self.generation_config = dict(generation_config, max_output_tokens=max_output_tokens)
+
+
+class PromptBuilder:
+    """Builds model prompts from templates compiled once per personality
+
+    User messages longer than ``max_message_tokens`` estimated tokens are
+    cut down, and each personality's generation config caps the answer at
+    its ``max_output_tokens`` (falling back to ``default_output_tokens``).
+    Unknown personalities use the ``default`` personality.
+    """
+
+    def __init__(self, personality_styles, generation_config, max_message_tokens=512,
+                 default_output_tokens=1024, default='friendly'):
+        self.max_message_tokens = max_message_tokens
+        self.templates = {
+            name: PromptTemplate(
+                style['tone'],
+                style.get('max_output_tokens') or default_output_tokens,
+                generation_config
+            )
+            for name, style in personality_styles.items()
+        }
+        self.default = self.templates[default]
+
+    def template(self, personality):
+        return self.templates.get(personality, self.default)
+
+    def truncate(self, user_message):
+        """Cut a message to the token budget; returns (message, truncated)"""
+        if estimate_tokens(user_message) <= self.max_message_tokens:
+            return user_message, False
+        # estimate_tokens counts about four characters per token
+        limit = max(0, (self.max_message_tokens - 1) * 4 - len(TRUNCATION_MARKER))
+        return user_message[:limit].rstrip() + TRUNCATION_MARKER, True
+
+    def build(self, user_message, personality, history=None):
+        """Full prompt text for a message and the earlier turns of its conversation"""
+        template = self.template(personality)
+        user_message, _ = self.truncate(user_message)
+        parts = [template.head]
+        if history:
+            # Earlier turns of the conversation give follow-up questions their context
+            parts.append(CONVERSATION_HEADER)
+            parts.append("\n".join(ROLE_LABELS.get(role, USER_LABEL) + text for role, text in history))
+            parts.append("\n\n")
+        parts += (MESSAGE_PREFIX, user_message, PROMPT_SUFFIX)
+        return ''.join(parts)
+
+    def usage(self, user_message, personality, history=None):
+        """Estimated prompt size and output cap for a message, without building the prompt"""
+        template = self.template(personality)
+        message, truncated = self.truncate(user_message)
+        length = template.fixed_length + len(message)
+        if history:
+            length += len(CONVERSATION_HEADER) + 1 + sum(
+                len(ROLE_LABELS.get(role, USER_LABEL)) + len(text) + 1 for role, text in history
+            )
+        return {
+            # Same estimate as estimate_tokens(prompt) for the built prompt
+            'prompt_tokens': length // 4 + 1,
+            'message_truncated': truncated,
+            'max_output_tokens': template.max_output_tokens,
+        }
+
+
+def create_prompt_builder(personality_styles, generation_config):
+    """Build the prompt builder configured through environment variables
+
+    CHATBOT_MAX_MESSAGE_TOKENS: longest user message sent to the model (default 512)
+    CHATBOT_MAX_OUTPUT_TOKENS: answer length cap for personalities without their own (default 1024)
+    CHATBOT_MAX_OUTPUT_TOKENS_<PERSONALITY>: cap for one personality, e.g. ..._FORMAL
+    """
+    default_output_tokens = int(os.getenv('CHATBOT_MAX_OUTPUT_TOKENS', '1024'))
+    styles = {}
+    for name, style in personality_styles.items():
+        override = os.getenv(f'CHATBOT_MAX_OUTPUT_TOKENS_{name.upper()}')
+        styles[name] = dict(style, max_output_tokens=int(override)) if override else style
+    return PromptBuilder(
+        styles,
+        generation_config,
+        max_message_tokens=int(os.getenv('CHATBOT_MAX_MESSAGE_TOKENS', '512')),
+        default_output_tokens=default_output_tokens,
+    )
@@ -0,0 +1,247 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+
+# Optional: google generativeai is imported on first use (see load_genai), so
+# processes that only need the knowledge base never pay for the SDK import.
+# GENAI_AVAILABLE stays None until then.
+genai = None
+GENAI_AVAILABLE = None
+_genai_lock = threading.Lock()
+
+# Gemini models to try, in order of preference
+GEMINI_MODELS = ('gemini-2.0-flash', 'gemini-1.5-flash', 'gemini-pro')
+
+LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+def load_genai(api_key):
+    """Import and configure google generativeai once; return whether it is usable"""
+    global genai, GENAI_AVAILABLE
+    if GENAI_AVAILABLE is None:
+        with _genai_lock:
+            if GENAI_AVAILABLE is None:
+                # Without an API key every call would fail, so skip the import
+                if not api_key:
+                    GENAI_AVAILABLE = False
+                    return GENAI_AVAILABLE
+                try:
+                    import google.generativeai as module
+                    module.configure(api_key=api_key)
+                    genai = module
+                    GENAI_AVAILABLE = True
+                except Exception:
+                    GENAI_AVAILABLE = False
+    return GENAI_AVAILABLE
+
+
+class ProviderError(Exception):
+    """Raised when a provider fails to produce a response"""
+
+
+class LLMProvider:
+    """Interface for text generation backends used by ChatbotEngine"""
+
+    name = 'base'
+
+    def available(self):
+        """Whether the provider can currently take requests"""
+        return True
+
+    def generate(self, prompt, generation_config=None):
+        """Return the full response text for a prompt"""
+        raise NotImplementedError
+
+    def stream(self, prompt, generation_config=None):
+        """Yield response text chunks; providers without streaming yield one chunk"""
+        text = self.generate(prompt, generation_config)
+        if text:
+            yield text
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google.generativeai, created on first use"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key=None, models=GEMINI_MODELS, model=None):
+        self.api_key = api_key
+        self.models = models
+        self._model = model
+        self._model_ready = model is not None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Gemini model, created on first use; None when the API is unavailable"""
+        if not self._model_ready:
+            with self._model_lock:
+                if not self._model_ready:
+                    self._model = self._create_model()
+                    self._model_ready = True
+        return self._model
+
+    def _create_model(self):
+        """Create the first Gemini model the SDK accepts"""
+        if not load_genai(self.api_key):
+            return None
+        # Try multiple models in order of preference
+        for name in self.models:
+            try:
+                return genai.GenerativeModel(name)
+            except Exception:
+                continue
+        return None
+
+    def available(self):
+        return self.model is not None
+
+    def generate(self, prompt, generation_config=None):
+        response = self.model.generate_content(prompt, generation_config=generation_config)
+        if response and response.text:
+            return response.text.strip()
+        return None
+
+    def stream(self, prompt, generation_config=None):
+        chunks = self.model.generate_content(prompt, generation_config=generation_config, stream=True)
+        for chunk in chunks:
+            text = chunk.text
+            if text:
+                yield text
+
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider for load tests
+
+    Latency is drawn from ``distribution`` around ``latency`` seconds with
+    spread ``jitter`` seconds (half-width for uniform, standard deviation
+    for normal, tail width for lognormal; exponential uses latency as the
+    mean). A ``failure_rate`` fraction of calls raise ProviderError and a
+    ``hang_rate`` fraction take ``hang_latency`` seconds, to exercise
+    timeouts. The same seed always yields the same sequence.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency=0.05, jitter=0.0, distribution='constant', failure_rate=0.0,
+                 hang_rate=0.0, hang_latency=30.0, seed=0, chunk_size=24, sleep=time.sleep):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {distribution!r}; expected one of {LATENCY_DISTRIBUTIONS}")
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.hang_latency = hang_latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, generation_config=None):
+        delay, fail = self._draw()
+        self._sleep(delay)
+        if fail:
+            raise ProviderError('Stub provider failure')
+        return self.answer(prompt, generation_config)
+
+    def stream(self, prompt, generation_config=None):
+        delay, fail = self._draw()
+        text = self.answer(prompt, generation_config)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for i, chunk in enumerate(chunks):
+            self._sleep(delay / len(chunks))
+            if fail and i >= len(chunks) // 2:
+                raise ProviderError('Stub provider failure')
+            yield chunk
+
+    def answer(self, prompt, generation_config=None):
+        """Deterministic response text for a prompt, cut to max_output_tokens like a real model"""
+        match = re.search(r'User message: (.*)', prompt)
+        message = match.group(1).strip() if match else prompt[-80:]
+        text = f"Stub answer for '{message}': ye ek offline test response hai."
+        max_tokens = (generation_config or {}).get('max_output_tokens')
+        if max_tokens:
+            text = text[:max_tokens * 4]
+        return text
+
+    def _draw(self):
+        """Pick (latency, fail) for one call from the seeded generator"""
+        with self._lock:
+            self.calls += 1
+            rng = self._rng
+            if rng.random() < self.hang_rate:
+                delay = self.hang_latency
+            elif self.distribution == 'uniform':
+                delay = rng.uniform(self.latency - self.jitter, self.latency + self.jitter)
+            elif self.distribution == 'normal':
+                delay = rng.gauss(self.latency, self.jitter)
+            elif self.distribution == 'lognormal' and self.latency > 0:
+                # latency is the median; jitter relative to it sets the tail
+                delay = self.latency * rng.lognormvariate(0, self.jitter / self.latency)
+            elif self.distribution == 'exponential':
+                delay = rng.expovariate(1 / self.latency) if self.latency > 0 else 0
+            else:
+                delay = self.latency
+            fail = rng.random() < self.failure_rate
+        return max(0.0, delay), fail
+
+
+class HTTPProvider(LLMProvider):
+    """Provider behind a small JSON HTTP API, such as stub_server.py"""
+
+    name = 'http'
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def generate(self, prompt, generation_config=None):
+        import urllib.request
+
+        body = json.dumps({'prompt': prompt, 'generation_config': generation_config}).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = json.loads(response.read())
+        except Exception as e:
+            raise ProviderError(f"HTTP provider error: {e}") from e
+        return data.get('text') or None
+
+
+def create_stub_provider():
+    """Build a StubProvider from CHATBOT_STUB_* environment variables"""
+    return StubProvider(
+        latency=float(os.getenv('CHATBOT_STUB_LATENCY_MS', '50')) / 1000,
+        jitter=float(os.getenv('CHATBOT_STUB_JITTER_MS', '0')) / 1000,
+        distribution=os.getenv('CHATBOT_STUB_DISTRIBUTION', 'constant'),
+        failure_rate=float(os.getenv('CHATBOT_STUB_FAILURE_RATE', '0')),
+        hang_rate=float(os.getenv('CHATBOT_STUB_HANG_RATE', '0')),
+        seed=int(os.getenv('CHATBOT_STUB_SEED', '0')),
+    )
+
+
+def create_provider():
+    """Build the provider selected through environment variables
+
+    CHATBOT_PROVIDER: 'gemini' (default), 'stub', 'http' or 'none'
+    CHATBOT_PROVIDER_URL: endpoint for the http provider
+    CHATBOT_STUB_*: latency, jitter, distribution, failure and hang rates, seed
+    """
+    name = os.getenv('CHATBOT_PROVIDER', 'gemini').lower()
+    if name == 'none':
+        return None
+    if name == 'stub':
+        return create_stub_provider()
+    if name == 'http':
+        return HTTPProvider(
+            os.getenv('CHATBOT_PROVIDER_URL', 'http://127.0.0.1:8765/generate'),
+            timeout=float(os.getenv('CHATBOT_MODEL_TIMEOUT', '15'))
+        )
+    if name != 'gemini':
+        raise ValueError(f"Unknown CHATBOT_PROVIDER {name!r}")
+    return GeminiProvider(api_key=os.getenv('GOOGLE_API_KEY'))
@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """In-process LRU store backed by an OrderedDict"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return (value, expires_at) and mark the entry as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        """Store an entry and return how many entries were evicted"""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """LRU store in a local SQLite file shared by several worker processes"""
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inherited = []
+        self._connect()
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'expires_at REAL NOT NULL, used_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def reopen(self):
+        """Open a fresh connection in a forked child process
+
+        A SQLite connection must not be used across fork, not even to close
+        it, so the parent's connection is only kept referenced.
+        """
+        self._lock = threading.Lock()
+        self._inherited.append(self._conn)
+        self._connect()
+
+    def get(self, key):
+        """Return (value, expires_at) and mark the entry as recently used"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+            return row
+
+    def set(self, key, value, expires_at):
+        """Store an entry and return how many entries were evicted"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)',
+                    (key, value, expires_at, time.time())
+                )
+                evicted = self._conn.execute(
+                    'DELETE FROM responses WHERE key IN ('
+                    'SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                ).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+
+class ResponseCache:
+    """Response cache with per-entry TTL on top of an LRU backend"""
+
+    def __init__(self, backend=None, ttl=3600):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user_message, tone):
+        """Cache key from the normalized message and personality tone"""
+        return tone + '\x00' + ' '.join(user_message.lower().split())
+
+    def get(self, key):
+        """Return the cached response or None"""
+        entry = self.backend.get(key)
+        if entry is not None and entry[1] <= time.time():
+            self.backend.delete(key)
+            entry = None
+            with self._lock:
+                self.expirations += 1
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        evicted = self.backend.set(key, value, expires_at)
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def clear(self):
+        self.backend.clear()
+
+    def reopen(self):
+        """Reset per-process state after fork"""
+        self._lock = threading.Lock()
+        if hasattr(self.backend, 'reopen'):
+            self.backend.reopen()
+
+    def stats(self):
+        """Return hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'size': len(self.backend),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_response_cache():
+    """Build the response cache configured through environment variables
+
+    CHATBOT_CACHE_BACKEND: 'memory' (default), 'sqlite' or 'none'
+    CHATBOT_CACHE_PATH: SQLite file for the shared backend
+    CHATBOT_CACHE_SIZE: maximum number of entries (default 1024)
+    CHATBOT_CACHE_TTL: entry lifetime in seconds (default 3600)
+    """
+    backend_name = os.getenv('CHATBOT_CACHE_BACKEND', 'memory').lower()
+    if backend_name == 'none':
+        return None
+
+    max_entries = int(os.getenv('CHATBOT_CACHE_SIZE', '1024'))
+    ttl = float(os.getenv('CHATBOT_CACHE_TTL', '3600'))
+
+    if backend_name == 'sqlite':
+        path = os.getenv('CHATBOT_CACHE_PATH', 'response_cache.sqlite3')
+        backend = SQLiteBackend(path, max_entries)
+    else:
+        backend = MemoryBackend(max_entries)
+    return ResponseCache(backend, ttl)
@@ -0,0 +1,152 @@
+import importlib.util
+import math
+import re
+from functools import lru_cache
+
+# Optional: numpy scores with array operations; plain Python is used otherwise.
+# It is imported on the first search, so importing this module stays cheap.
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+WORD_RE = re.compile(r'\w+')
+
+NGRAM_SIZES = (3, 4)
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    """Count character n-grams of each word, padded so word edges are features"""
+    counts = {}
+    for word in WORD_RE.findall(text.lower()):
+        for gram in _word_ngrams(word, sizes):
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+@lru_cache(maxsize=8192)
+def _word_ngrams(word, sizes):
+    padded = f' {word} '
+    return tuple(padded[i:i + n] for n in sizes for i in range(len(padded) - n + 1))
+
+
+class Retriever:
+    """Character n-gram TF-IDF index over knowledge base answers
+
+    ``documents`` is a list of (text, answer) pairs. Each text is turned
+    into a sublinear TF-IDF vector over character n-grams, so paraphrases,
+    inflections and typos still share most features. Vectors are L2
+    normalized, so a message's score against every document is the sum of
+    its n-gram weights times theirs (cosine similarity). Only the postings of
+    n-grams a message contains are visited: with NumPy they are copied into
+    one compressed sparse column matrix on the first search and summed with
+    ``bincount``; without it, scoring walks a dict of postings lists.
+    """
+
+    def __init__(self, documents, sizes=NGRAM_SIZES):
+        self.sizes = sizes
+        self.answers = tuple(answer for _, answer in documents)
+        counts = [char_ngrams(text, sizes) for text, _ in documents]
+
+        document_frequency = {}
+        for grams in counts:
+            for gram in grams:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+        total = len(documents)
+        self.vocabulary = {gram: i for i, gram in enumerate(sorted(document_frequency))}
+        self.idf = [0.0] * len(self.vocabulary)
+        for gram, i in self.vocabulary.items():
+            self.idf[i] = math.log((1 + total) / (1 + document_frequency[gram])) + 1
+        # Weight given to n-grams no document contains; they only lower the score
+        self.unknown_idf = math.log(1 + total) + 1
+        self._features = {gram: (i, self.idf[i]) for gram, i in self.vocabulary.items()}
+
+        rows = [self._weights(grams) for grams in counts]
+        self.vectorized = NUMPY_AVAILABLE
+        self.postings = {}
+        for doc, row in enumerate(rows):
+            for i, weight in row.items():
+                self.postings.setdefault(i, []).append((doc, weight))
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.answers)
+
+    def search(self, text, threshold=0.0):
+        """Return (answer, score) for the most similar document, or None below threshold"""
+        return self.search_batch([text], threshold)[0]
+
+    def search_batch(self, texts, threshold=0.0):
+        """Score many messages at once; one (answer, score) or None per message"""
+        if not self.answers:
+            return [None] * len(texts)
+        vectors = [self._weights(char_ngrams(text, self.sizes)) for text in texts]
+        if self.vectorized:
+            best, scores = self._score_matrix(vectors)
+        else:
+            best, scores = self._score_postings(vectors)
+        return [
+            (self.answers[doc], score) if score > 0 and score >= threshold else None
+            for doc, score in zip(best, scores)
+        ]
+
+    def _weights(self, grams):
+        """Unit-length TF-IDF weights of known n-grams, keyed by vocabulary index"""
+        weights = {}
+        norm = 0.0
+        features = self._features
+        for gram, count in grams.items():
+            tf = 1 + math.log(count) if count > 1 else 1.0
+            feature = features.get(gram)
+            if feature is None:
+                weight = tf * self.unknown_idf
+            else:
+                weight = tf * feature[1]
+                weights[feature[0]] = weight
+            norm += weight * weight
+        norm = math.sqrt(norm) or 1.0
+        return {i: weight / norm for i, weight in weights.items()}
+
+    def _sparse_matrix(self):
+        """Postings as (indptr, docs, weights) arrays; n-gram i owns docs[indptr[i]:indptr[i + 1]]"""
+        if self._matrix is None:
+            import numpy as np
+
+            lengths = [len(self.postings.get(i, ())) for i in range(len(self.vocabulary))]
+            indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            entries = [entry for i in range(len(lengths)) for entry in self.postings.get(i, ())]
+            docs = np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries))
+            weights = np.fromiter((weight for _, weight in entries), dtype=np.float32, count=len(entries))
+            self._matrix = (indptr, docs, weights)
+        return self._matrix
+
+    def _score_matrix(self, vectors):
+        import numpy as np
+
+        indptr, docs, weights = self._sparse_matrix()
+        # One entry per (message, n-gram) pair
+        rows = np.fromiter((row for row, weights in enumerate(vectors) for _ in weights), dtype=np.int64)
+        columns = np.fromiter((i for weights in vectors for i in weights), dtype=np.int64, count=len(rows))
+        values = np.fromiter((w for weights in vectors for w in weights.values()), dtype=np.float32, count=len(rows))
+        # Expand each entry into the positions of its postings
+        starts = indptr[columns]
+        lengths = indptr[columns + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = np.arange(offsets.size) + offsets
+        documents = len(self.answers)
+        cells = docs[positions] + np.repeat(rows * documents, lengths)
+        products = weights[positions] * np.repeat(values, lengths)
+        scores = np.bincount(cells, weights=products, minlength=len(vectors) * documents)
+        scores = scores.reshape(len(vectors), documents)
+        best = scores.argmax(axis=1)
+        return best.tolist(), scores[np.arange(len(vectors)), best].tolist()
+
+    def _score_postings(self, vectors):
+        best, top = [], []
+        for weights in vectors:
+            scores = {}
+            for i, weight in weights.items():
+                for doc, doc_weight in self.postings.get(i, ()):
+                    scores[doc] = scores.get(doc, 0.0) + weight * doc_weight
+            doc = max(scores, key=scores.get) if scores else 0
+            best.append(doc)
+            top.append(scores.get(doc, 0.0))
+        return best, top
@@ -19,6 +19,9 @@ let chatState = {
     currentUser: 'User',
 };
 
+// Conversation id so the backend can remember earlier turns
+let sessionId = createSessionId();
+
 // Initialize App
 document.addEventListener('DOMContentLoaded', () => {
     loadSettings();
@@ -130,30 +133,51 @@ async function sendMessage() {
     showTypingIndicator();
 
     try {
-        // Call Python backend API
-        const response = await fetch(`${API_URL}/chat`, {
+        // Call Python backend API and render chunks as they arrive
+        const response = await fetch(`${API_URL}/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
                 message: messageText,
-                personality: chatState.currentTone
+                personality: chatState.currentTone,
+                session_id: sessionId
             })
         });
 
-        const data = await response.json();
-        removeTypingIndicator();
+        if (!response.ok || !response.body) {
+            throw new Error(`Stream failed with status ${response.status}`);
+        }
 
-        if (data.success) {
-            const botResponse = data.response;
-            addMessage(botResponse, 'bot');
+        let botResponse = '';
+        let botMessage = null;
+        let timestamp = new Date().toISOString();
+        let failed = false;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'done') {
+                timestamp = data.timestamp;
+            } else if (event === 'error') {
+                failed = true;
+            } else if (data.chunk) {
+                if (!botMessage) {
+                    removeTypingIndicator();
+                    botMessage = addMessage('', 'bot');
+                }
+                botResponse += data.chunk;
+                updateMessage(botMessage, botResponse);
+            }
+        });
 
+        removeTypingIndicator();
+
+        if (botResponse && !failed) {
             if (chatState.autoSave) {
                 chatState.conversationHistory.push({
                     role: 'bot',
                     content: botResponse,
-                    timestamp: data.timestamp
+                    timestamp: timestamp
                 });
                 saveSettings();
             }
@@ -161,7 +185,7 @@ async function sendMessage() {
             if (chatState.soundEnabled) {
                 playNotificationSound();
             }
-        } else {
+        } else if (!botResponse) {
             addMessage('Sorry, kuch error hua! 😅', 'bot');
         }
     } catch (error) {
@@ -173,6 +197,34 @@ async function sendMessage() {
     }
 }
 
+// Parse a Server-Sent Events response body and call onEvent for each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf('\n\n');
+
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
 function addMessage(text, sender) {
     const container = document.getElementById('messagesContainer');
     const messageDiv = document.createElement('div');
@@ -191,6 +243,12 @@ function addMessage(text, sender) {
 
     container.appendChild(messageDiv);
     scrollToBottom();
+    return messageDiv;
+}
+
+function updateMessage(messageDiv, text) {
+    messageDiv.querySelector('.message-content p').textContent = text;
+    scrollToBottom();
 }
 
 function showTypingIndicator() {
@@ -324,6 +382,7 @@ function applyLoadedSettings() {
 function clearHistory() {
     if (confirm('Are you sure you want to clear all conversations?')) {
         chatState.conversationHistory = [];
+        sessionId = createSessionId();
         document.getElementById('messagesContainer').innerHTML = '';
         addWelcomeMessage();
         saveSettings();
@@ -368,6 +427,13 @@ function addWelcomeMessage() {
     container.appendChild(welcomeDiv);
 }
 
+function createSessionId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 function escapeHtml(text) {
     const div = document.createElement('div');
     div.textContent = text;
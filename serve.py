@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Production server: preforked workers sharing one preloaded engine
+
+    python serve.py --workers 4 --threads 8 --port 5000
+
+The Flask app, ChatbotEngine and compiled knowledge base are built once in
+the parent process, then every worker is forked from it, so that memory is
+shared copy-on-write and workers start instantly. All workers accept
+connections from one listening socket; each serves up to ``threads``
+requests at a time. On SIGTERM or Ctrl+C the workers report not ready on
+/api/ready, keep serving for the drain grace period so load balancers see
+that before the socket stops accepting, then stop accepting new
+connections, finish the requests they have and exit; workers still busy
+after the drain timeout are killed.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+class RequestHandler(WSGIRequestHandler):
+    # One request per connection, so idle keep-alive clients never hold a thread
+    protocol_version = 'HTTP/1.0'
+
+    def log_request(self, code='-', size='-'):
+        pass
+
+
+class WorkerServer(BaseWSGIServer):
+    """WSGI server handling requests on a bounded thread pool
+
+    A connection is only accepted once a thread is free, so a busy worker
+    leaves new connections in the shared backlog for its siblings.
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app, sock, threads):
+        super().__init__(*sock.getsockname()[:2], app, handler=RequestHandler, fd=sock.fileno())
+        self.socket.setblocking(False)
+        self._slots = threading.BoundedSemaphore(threads)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+    def get_request(self):
+        self._slots.acquire()
+        try:
+            # Another worker may have taken the connection first (BlockingIOError)
+            conn, address = self.socket.accept()
+            conn.setblocking(True)
+            return conn, address
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def drain(self, timeout):
+        """Wait up to timeout seconds for in-flight requests once serving has stopped"""
+        done = threading.Thread(target=self._pool.shutdown, daemon=True)
+        done.start()
+        done.join(timeout)
+
+
+def listen(host, port, backlog=2048):
+    """Bind the socket every worker accepts from"""
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the app and warm the engine before forking"""
+    import app as app_module
+
+    # Touch the hot paths so lazily built structures exist before fork.
+    # Gemini clients hold network state that cannot cross fork, so the
+    # provider still creates its model lazily in each worker.
+    app_module.chatbot._fallback_response('Namaste')
+    app_module.chatbot.kb.retriever.search('Namaste')
+    app_module.chatbot._build_prompt('Namaste', 'friendly')
+
+    # Move everything allocated so far out of the collector's reach, so
+    # garbage collection in workers does not dirty the shared pages
+    gc.collect()
+    gc.freeze()
+    return app_module
+
+
+def per_worker_state(app_module):
+    """State every worker keeps to itself, so it is not shared across workers"""
+    from response_cache import MemoryBackend
+
+    chatbot = app_module.chatbot
+    state = []
+    if chatbot.session_store is not None:
+        state.append('conversation history (a follow-up on another worker starts a new conversation)')
+    if chatbot.response_cache is not None and isinstance(chatbot.response_cache.backend, MemoryBackend):
+        state.append('response cache (set CHATBOT_CACHE_BACKEND=sqlite to share it)')
+    if app_module.rate_limiter:
+        state.append('rate limits (a client may send up to workers x CHATBOT_RATE_LIMIT)')
+    if app_module.admission:
+        state.append('admission limits (up to workers x CHATBOT_MAX_IN_FLIGHT requests at once)')
+    if chatbot.circuit_breaker is not None:
+        state.append('circuit breaker')
+    state.append('/api/metrics and /api/health numbers')
+    return state
+
+
+def run_worker(app_module, sock, threads, drain_timeout, drain_grace=0):
+    """Serve requests in a forked worker until told to drain"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    app_module.chatbot.after_fork()
+    if app_module.conversation_log:
+        app_module.conversation_log.after_fork()
+    server = WorkerServer(app_module.app, sock, threads)
+
+    def stop(signum, frame):
+        # Report not ready first, then stop accepting once load balancers have
+        # had drain_grace seconds to notice; shutdown() blocks until
+        # serve_forever returns, so it cannot run in this signal handler
+        app_module.draining.set()
+        threading.Thread(target=shutdown, daemon=True).start()
+
+    def shutdown():
+        time.sleep(drain_grace)
+        server.shutdown()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever(poll_interval=0.2)
+    server.drain(drain_timeout)
+    if app_module.conversation_log:
+        app_module.conversation_log.close()
+
+
+class Arbiter:
+    """Parent process: forks workers, replaces crashed ones, drains on shutdown"""
+
+    def __init__(self, app_module, sock, workers, threads, drain_timeout, drain_grace=0):
+        self.app_module = app_module
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.drain_timeout = drain_timeout
+        self.drain_grace = drain_grace
+        self.children = set()
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.app_module, self.sock, self.threads, self.drain_timeout, self.drain_grace)
+            except Exception as e:
+                print(f"Worker Error: {e}", file=sys.stderr)
+                status = 1
+            finally:
+                os._exit(status)
+        self.children.add(pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"Serving on {self.sock.getsockname()} with {self.workers} workers x {self.threads} threads", flush=True)
+
+        while self.children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                print(f"Worker {pid} exited; starting a replacement", file=sys.stderr)
+                time.sleep(0.1)
+                self.spawn()
+
+    def stop(self, signum=None, frame=None):
+        """Ask every worker to drain, then kill the ones still running at the deadline"""
+        if self.stopping:
+            return
+        self.stopping = True
+        for pid in list(self.children):
+            _signal(pid, signal.SIGTERM)
+        threading.Thread(target=self._kill_after, args=(self.drain_grace + self.drain_timeout + 5,), daemon=True).start()
+
+    def _kill_after(self, timeout):
+        time.sleep(timeout)
+        for pid in list(self.children):
+            _signal(pid, signal.SIGKILL)
+
+
+def _signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def serve(host='127.0.0.1', port=5000, workers=None, threads=8, drain_timeout=30, drain_grace=5):
+    """Run the preforked server until SIGTERM or Ctrl+C"""
+    workers = workers or os.cpu_count() or 1
+    sock = listen(host, port)
+    app_module = preload()
+
+    if not hasattr(os, 'fork'):
+        # No fork on this platform: one process serving on a thread pool
+        server = WorkerServer(app_module.app, sock, threads * workers)
+        print(f"Serving on {sock.getsockname()} with {threads * workers} threads", flush=True)
+        server.serve_forever()
+        return
+
+    if workers > 1:
+        print(f"Warning: each of the {workers} workers keeps its own "
+              + '; '.join(per_worker_state(app_module)), file=sys.stderr, flush=True)
+        # Workers sharing one log file would interleave writes and race on rotation
+        if app_module.conversation_log and app_module.conversation_log.per_process():
+            print(f"Conversation log: one file per worker, {app_module.conversation_log.path_template}",
+                  file=sys.stderr, flush=True)
+    Arbiter(app_module, sock, workers, threads, drain_timeout, drain_grace).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.getenv('CHATBOT_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('CHATBOT_PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('CHATBOT_WORKERS', '0')),
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('CHATBOT_THREADS', '8')),
+                        help='concurrent requests per worker')
+    parser.add_argument('--drain-timeout', type=float, default=float(os.getenv('CHATBOT_DRAIN_TIMEOUT', '30')),
+                        help='seconds workers get to finish in-flight requests on shutdown')
+    parser.add_argument('--drain-grace', type=float, default=float(os.getenv('CHATBOT_DRAIN_GRACE', '5')),
+                        help='seconds workers keep accepting while /api/ready reports draining')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.drain_timeout, args.drain_grace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Interned role names shared by every turn
+USER = sys.intern('user')
+MODEL = sys.intern('model')
+
+MAX_SESSION_ID_LENGTH = 128
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+class Turn:
+    """One message in a conversation"""
+
+    __slots__ = ('role', 'text', 'tokens', 'size')
+
+    def __init__(self, role, text):
+        self.role = role
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.size = sys.getsizeof(self) + sys.getsizeof(text)
+
+
+class Session:
+    """Recent turns of one conversation, trimmed to a token budget"""
+
+    __slots__ = ('turns', 'tokens', 'size', 'last_used')
+
+    def __init__(self):
+        self.turns = deque()
+        self.tokens = 0
+        self.size = sys.getsizeof(self) + sys.getsizeof(self.turns)
+        self.last_used = time.monotonic()
+
+    def append(self, turn, max_turns, token_budget):
+        """Add a turn and drop the oldest ones over the limits, returning freed bytes"""
+        self.turns.append(turn)
+        self.tokens += turn.tokens
+        self.size += turn.size
+        freed = 0
+        while len(self.turns) > 1 and (len(self.turns) > max_turns or self.tokens > token_budget):
+            old = self.turns.popleft()
+            self.tokens -= old.tokens
+            self.size -= old.size
+            freed += old.size
+        return freed
+
+
+class SessionStore:
+    """Bounded conversation memory keyed by a client-supplied session id
+
+    Each session keeps at most ``max_turns`` turns within ``token_budget``
+    estimated tokens. Sessions idle for longer than ``idle_timeout`` seconds
+    expire, and the least recently used sessions are evicted whenever the
+    store grows past ``max_bytes``.
+    """
+
+    def __init__(self, max_turns=10, token_budget=1024, max_bytes=64 * 1024 * 1024, idle_timeout=1800):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.size = 0
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @staticmethod
+    def is_valid_id(session_id):
+        return isinstance(session_id, str) and 0 < len(session_id) <= MAX_SESSION_ID_LENGTH
+
+    def history(self, session_id):
+        """Return the (role, text) pairs remembered for a session"""
+        if not self.is_valid_id(session_id):
+            return []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if time.monotonic() - session.last_used > self.idle_timeout:
+                self._remove(session_id)
+                return []
+            self._sessions.move_to_end(session_id)
+            return [(turn.role, turn.text) for turn in session.turns]
+
+    def append(self, session_id, user_message, response):
+        """Record a user message and the bot response"""
+        if not self.is_valid_id(session_id):
+            return
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or now - session.last_used > self.idle_timeout:
+                if session is not None:
+                    self._remove(session_id)
+                session_id = sys.intern(session_id)
+                session = self._sessions[session_id] = Session()
+                self.size += session.size
+            self._sessions.move_to_end(session_id)
+            session.last_used = now
+
+            for turn in (Turn(USER, user_message), Turn(MODEL, response)):
+                self.size += turn.size
+                self.size -= session.append(turn, self.max_turns, self.token_budget)
+
+            self._evict(now)
+
+    def clear(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.size -= session.size
+
+    def _evict(self, now):
+        """Drop expired sessions, then least recently used ones over the memory ceiling"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            idle = now - session.last_used > self.idle_timeout
+            if not idle and self.size <= self.max_bytes:
+                break
+            self._remove(session_id)
+            self.evictions += 1
+
+
+def create_session_store():
+    """Build the session store configured through environment variables
+
+    CHATBOT_SESSION_TURNS: turns remembered per session (default 10)
+    CHATBOT_SESSION_TOKENS: token budget per session history (default 1024)
+    CHATBOT_SESSION_MEMORY_MB: memory ceiling for all sessions (default 64)
+    CHATBOT_SESSION_IDLE: seconds before an idle session expires (default 1800)
+    """
+    return SessionStore(
+        max_turns=int(os.getenv('CHATBOT_SESSION_TURNS', '10')),
+        token_budget=int(os.getenv('CHATBOT_SESSION_TOKENS', '1024')),
+        max_bytes=int(float(os.getenv('CHATBOT_SESSION_MEMORY_MB', '64')) * 1024 * 1024),
+        idle_timeout=float(os.getenv('CHATBOT_SESSION_IDLE', '1800')),
+    )
@@ -0,0 +1,79 @@
+import os
+import threading
+
+from metrics import COALESCED_REQUESTS
+
+
+class _Call:
+    """One in-flight call and the callers waiting on it"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and receive the same result, or the same exception. The key is
+    forgotten as soon as the call finishes, so later callers start a new
+    call; caching finished results is the response cache's job.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            COALESCED_REQUESTS.inc('waiter')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCED_REQUESTS.inc('leader')
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+            }
+
+
+def create_single_flight():
+    """Build the request coalescer unless CHATBOT_COALESCE is 'off'"""
+    if os.getenv('CHATBOT_COALESCE', 'on').lower() == 'off':
+        return None
+    return SingleFlight()
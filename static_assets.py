@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+# Optional: Try importing brotli for smaller text assets; gzip is always built
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# The only files served to browsers; everything else in the project stays private
+ASSET_FILES = ('index.html', 'script.js', 'styles.css', 'logo-styles.css', 'ai.png', 'my.JPG')
+ENTRY_POINT = 'index.html'
+
+# Fingerprinted URLs never change content, so browsers may keep them for a year
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Plain URLs must be revalidated, which costs a 304 when nothing changed
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 256
+
+
+class Asset:
+    """One file with its fingerprint and precompressed variants"""
+
+    __slots__ = ('name', 'url', 'content_type', 'digest', 'variants')
+
+    def __init__(self, name, data, fingerprint=True):
+        self.name = name
+        self.content_type = _content_type(name)
+        self.digest = hashlib.sha256(data).hexdigest()[:16]
+        stem, ext = os.path.splitext(name)
+        self.url = f"{stem}.{self.digest[:10]}{ext}" if fingerprint else name
+
+        # Encodings in order of preference; identity is always available
+        self.variants = {}
+        if len(data) >= MIN_COMPRESS_SIZE and self.content_type.startswith(COMPRESSIBLE_TYPES):
+            if BROTLI_AVAILABLE:
+                self.variants['br'] = brotli.compress(data, quality=11)
+            self.variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            # Keep only variants that are actually smaller
+            self.variants = {encoding: body for encoding, body in self.variants.items() if len(body) < len(data)}
+        self.variants['identity'] = data
+
+    def etag(self, encoding):
+        # Strong validators must differ between encodings of the same content
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+
+class StaticAssets:
+    """In-memory, precompressed copies of the allow-listed front-end files
+
+    Every asset except the entry page also gets a content-hashed URL
+    (``script.<hash>.js``) served as immutable, and references to those
+    files inside the other assets are rewritten to the hashed URLs. Plain
+    URLs stay available with revalidation through strong ETags. With
+    ``reload`` the files are rebuilt when they change on disk (useful
+    while developing the front end).
+    """
+
+    def __init__(self, root=ROOT, names=ASSET_FILES, entry_point=ENTRY_POINT, reload=False, check_interval=1.0):
+        self.root = root
+        self.names = tuple(names)
+        self.entry_point = entry_point
+        self.reload = reload
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtimes = None
+        self._routes = {}
+        self.build()
+
+    def build(self):
+        """Read, fingerprint and compress every asset, then swap them in"""
+        mtimes = self._read_mtimes()
+        # Binary files first, then text that may refer to them, the entry page last
+        order = sorted(self.names, key=lambda name: (name == self.entry_point, _is_text(name)))
+        urls = {}
+        routes = {}
+        for name in order:
+            with open(os.path.join(self.root, name), 'rb') as f:
+                data = f.read()
+            if _is_text(name) and urls:
+                data = _rewrite_references(data, urls)
+            asset = Asset(name, data, fingerprint=name != self.entry_point)
+            routes[name] = (asset, REVALIDATE)
+            if asset.url != name:
+                routes[asset.url] = (asset, IMMUTABLE)
+                urls[name] = asset.url
+        self._routes = routes
+        self._mtimes = mtimes
+
+    def url_for(self, name):
+        """Fingerprinted URL of an asset"""
+        return self._routes[name][0].url
+
+    def respond(self, path, accept_encoding='', if_none_match=None):
+        """(status, body, headers) for a request path, or None when it is not an asset"""
+        if self.reload:
+            self._reload_if_changed()
+        route = self._routes.get(path or self.entry_point)
+        if route is None:
+            return None
+        asset, cache_control = route
+
+        encoding = _negotiate(accept_encoding, asset.variants)
+        etag = asset.etag(encoding)
+        headers = {
+            'Content-Type': asset.content_type,
+            'ETag': etag,
+            'Cache-Control': cache_control,
+            'X-Content-Type-Options': 'nosniff',
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if _etag_matches(if_none_match, etag):
+            return 304, b'', headers
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, asset.variants[encoding], headers
+
+    def stats(self):
+        assets = {asset.name: asset for asset, _ in self._routes.values()}
+        return {
+            name: {
+                'url': asset.url,
+                'bytes': {encoding: len(body) for encoding, body in asset.variants.items()},
+            }
+            for name, asset in assets.items()
+        }
+
+    def _read_mtimes(self):
+        return {name: os.stat(os.path.join(self.root, name)).st_mtime_ns for name in self.names}
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_interval
+            if self._read_mtimes() != self._mtimes:
+                self.build()
+        except Exception as e:
+            print(f"Static Asset Error: {e}")
+        finally:
+            self._lock.release()
+
+
+def _is_text(name):
+    return _content_type(name).startswith(COMPRESSIBLE_TYPES)
+
+
+def _content_type(name):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _rewrite_references(data, urls):
+    """Point quoted or url() references to other assets at their hashed URLs"""
+    pattern = re.compile(
+        rb'(?<=["\'(])(' + b'|'.join(re.escape(name.encode()) for name in urls) + rb')(?=["\')])'
+    )
+    return pattern.sub(lambda match: urls[match.group(1).decode()].encode(), data)
+
+
+def _negotiate(accept_encoding, variants):
+    """Pick the preferred encoding the client accepts (q > 0)"""
+    accepted = {}
+    for item in (accept_encoding or '').lower().split(','):
+        token, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip()] = q
+    for encoding in variants:
+        if encoding == 'identity':
+            break
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def create_static_assets():
+    """Build the asset pipeline; CHATBOT_STATIC_RELOAD=on rebuilds when files change"""
+    return StaticAssets(reload=os.getenv('CHATBOT_STATIC_RELOAD', 'off').lower() == 'on')
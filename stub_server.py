@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tiny local HTTP stand-in for the LLM, backed by StubProvider
+
+Run it and point the engine at it:
+
+    python stub_server.py --port 8765 --latency-ms 200 --failure-rate 0.05
+    CHATBOT_PROVIDER=http CHATBOT_PROVIDER_URL=http://127.0.0.1:8765/generate python app.py
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from providers import LATENCY_DISTRIBUTIONS, ProviderError, StubProvider
+
+
+def make_handler(provider):
+    """Request handler class serving POST /generate from a provider"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            if self.path != '/generate':
+                self._send_json(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                data = json.loads(self.rfile.read(length) or b'{}')
+                text = provider.generate(data.get('prompt', ''), data.get('generation_config'))
+                self._send_json(200, {'text': text})
+            except ProviderError as e:
+                self._send_json(503, {'error': str(e)})
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep load tests quiet
+            pass
+
+    return StubHandler
+
+
+def make_server(provider, host='127.0.0.1', port=8765):
+    """Create (but do not start) a threaded stub server"""
+    return ThreadingHTTPServer((host, port), make_handler(provider))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='constant')
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--hang-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    provider = StubProvider(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        distribution=args.distribution,
+        failure_rate=args.failure_rate,
+        hang_rate=args.hang_rate,
+        seed=args.seed,
+    )
+    server = make_server(provider, args.host, args.port)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for per-client rate limiting and admission control"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from admission import AdmissionController, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limiter_allows_burst_then_rate():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire('a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('a') == pytest.approx(0.5)
+    # Other clients have their own bucket
+    assert limiter.acquire('b') == 0
+
+    clock.now = 0.5
+    assert limiter.acquire('a') == 0
+    assert limiter.acquire('a') > 0
+    assert limiter.stats()['limited'] == 2
+
+
+def test_rate_limiter_charges_cost_up_to_a_full_bucket():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=1, burst=5, clock=clock)
+
+    assert limiter.acquire('a', cost=3) == 0
+    assert limiter.acquire('a', cost=3) == pytest.approx(1)
+    clock.now = 10
+    assert limiter.acquire('a', cost=100) == 0
+    assert limiter.acquire('a') == pytest.approx(1)
+
+
+def test_rate_limiter_forgets_least_recent_clients():
+    limiter = RateLimiter(rate=1, burst=1, max_clients=2, clock=FakeClock())
+    limiter.acquire('a')
+    limiter.acquire('b')
+    limiter.acquire('c')
+
+    assert limiter.stats()['clients'] == 2
+    # 'a' was forgotten, so it starts over with a full bucket
+    assert limiter.acquire('a') == 0
+    assert limiter.acquire('c') > 0
+
+
+def hold_slots(controller, count):
+    """Occupy admission slots from other threads until the returned event is set"""
+    release = threading.Event()
+    entered = threading.Barrier(count + 1)
+
+    def hold():
+        with controller.admit() as admitted:
+            entered.wait(5)
+            release.wait(5)
+            return admitted
+
+    pool = ThreadPoolExecutor(max_workers=count)
+    futures = [pool.submit(hold) for _ in range(count)]
+    entered.wait(5)
+    return release, futures, pool
+
+
+def test_overflow_is_shed_without_waiting():
+    controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=5)
+    release, futures, pool = hold_slots(controller, 2)
+
+    start = time.monotonic()
+    with controller.admit() as admitted:
+        assert not admitted
+    assert time.monotonic() - start < 1
+    assert controller.stats()['shed'] == 1
+
+    release.set()
+    assert all(future.result(5) for future in futures)
+    pool.shutdown()
+    with controller.admit() as admitted:
+        assert admitted
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_queued_request_gets_a_freed_slot():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    release, futures, pool = hold_slots(controller, 1)
+
+    def wait_for_slot():
+        with controller.admit() as admitted:
+            return admitted
+
+    with ThreadPoolExecutor(max_workers=1) as waiter:
+        queued = waiter.submit(wait_for_slot)
+        while controller.stats()['queued'] < 1:
+            time.sleep(0.001)
+        # The queue is full, so the next request overflows
+        with controller.admit() as admitted:
+            assert not admitted
+        release.set()
+        assert queued.result(5) is True
+    pool.shutdown()
+    assert controller.stats()['admitted'] == 2
+
+
+def test_queue_timeout_sheds():
+    controller = AdmissionController(max_in_flight=1, max_queue=5, queue_timeout=0.05, overflow='reject')
+    release, futures, pool = hold_slots(controller, 1)
+
+    with controller.admit() as admitted:
+        assert not admitted
+    assert controller.retry_after() >= 1
+
+    release.set()
+    pool.shutdown()
+
+
+def test_unknown_overflow_mode():
+    with pytest.raises(ValueError):
+        AdmissionController(overflow='drop')
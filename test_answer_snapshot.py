@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for memory-mapped answer snapshots"""
+
+import gzip
+import json
+import os
+
+import pytest
+
+import answer_snapshot
+from answer_snapshot import AnswerSnapshot, write_snapshot
+from precompute import logged_questions
+
+
+def test_lookup_finds_every_key(tmp_path):
+    path = str(tmp_path / 'answers.snapshot')
+    answers = {f'casual\x00question {i}': f'answer {i} ' * (i % 7) for i in range(500)}
+    answers['casual\x00namaste'] = 'नमस्ते! 😊'
+    assert write_snapshot(path, answers) == 501
+
+    snapshot = AnswerSnapshot(path)
+    assert len(snapshot) == 501
+    assert all(snapshot.get(key) == answer for key, answer in answers.items())
+    assert snapshot.get('casual\x00unknown') is None
+    assert snapshot.stats()['hits'] == 501
+    assert snapshot.stats()['misses'] == 1
+
+
+def test_keys_sharing_a_hash_are_told_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_snapshot, 'key_hash', lambda key: len(key))
+    path = str(tmp_path / 'answers.snapshot')
+    write_snapshot(path, {'aa': 'first', 'bb': 'second', 'c': 'third'})
+
+    snapshot = AnswerSnapshot(path)
+    assert (snapshot.get('aa'), snapshot.get('bb'), snapshot.get('c')) == ('first', 'second', 'third')
+    assert snapshot.get('dd') is None
+
+
+def test_rebuilt_file_is_picked_up(tmp_path):
+    path = str(tmp_path / 'answers.snapshot')
+    snapshot = AnswerSnapshot(path, check_interval=0.0001)
+    assert snapshot.get('key') is None
+
+    write_snapshot(path, {'key': 'old'})
+    assert snapshot.get('key') == 'old'
+    write_snapshot(path, {'key': 'new', 'other': 'answer'})
+    assert snapshot.get('key') == 'new'
+    assert len(snapshot) == 2
+    assert os.listdir(tmp_path) == ['answers.snapshot']
+
+
+def test_invalid_file_is_ignored(tmp_path, capsys):
+    path = tmp_path / 'answers.snapshot'
+    path.write_bytes(b'not a snapshot at all')
+
+    snapshot = AnswerSnapshot(str(path))
+    assert snapshot.get('key') is None
+    assert 'Answer Snapshot Error' in capsys.readouterr().out
+
+
+def test_write_rejects_nothing_partial(tmp_path):
+    path = str(tmp_path / 'answers.snapshot')
+    write_snapshot(path, {'key': 'answer'})
+    with pytest.raises(AttributeError):
+        write_snapshot(path, {'key': None})
+
+    assert AnswerSnapshot(path).get('key') == 'answer'
+    assert os.listdir(tmp_path) == ['answers.snapshot']
+
+
+def test_logged_questions_ranks_by_frequency(tmp_path):
+    records = ['Python kya hai?'] * 3 + ['python  KYA hai?', 'JavaScript?'] + ['API kya hai'] * 2
+    with gzip.open(tmp_path / 'chat.jsonl.1.gz', 'wt', encoding='utf-8') as f:
+        for message in records:
+            f.write(json.dumps({'message': message}) + '\n')
+    (tmp_path / 'chat.jsonl').write_text('{"message": "API kya hai"}\nnot json\n', encoding='utf-8')
+
+    paths = [str(tmp_path / 'chat.jsonl.1.gz'), str(tmp_path / 'chat.jsonl')]
+    assert logged_questions(paths, 2) == ['Python kya hai?', 'API kya hai']
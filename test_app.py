@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the Flask API endpoints"""
+
+import json
+
+import pytest
+
+import app as app_module
+from app import app
+from conversation_log import ConversationLogger
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """Answer from the knowledge base, even where the Gemini SDK and an API key are present"""
+    monkeypatch.setattr(app_module.chatbot, 'provider', None)
+
+
+def parse_events(body):
+    """Split a Server-Sent Events body into (event, data) pairs"""
+    events = []
+    for raw in body.strip().split('\n\n'):
+        event = 'message'
+        data = ''
+        for line in raw.split('\n'):
+            if line.startswith('event: '):
+                event = line[7:]
+            elif line.startswith('data: '):
+                data += line[6:]
+        events.append((event, json.loads(data)))
+    return events
+
+
+def test_chat():
+    client = app.test_client()
+    response = client.post('/api/chat', json={'message': 'Python kaise sikhun?'})
+
+    assert response.status_code == 200
+    assert response.json['success']
+    assert 'Python' in response.json['response']
+    assert response.json['prompt'] is None
+
+
+def test_chat_reports_prompt_usage_for_model_answers(monkeypatch):
+    from providers import StubProvider
+    monkeypatch.setattr(app_module.chatbot, 'provider', StubProvider(latency=0))
+    client = app.test_client()
+    response = client.post('/api/chat', json={'message': 'Prompt usage ka test'})
+
+    assert response.status_code == 200
+    assert response.json['prompt']['max_output_tokens'] > 0
+    assert response.json['prompt']['message_truncated'] is False
+
+
+def test_chat_logs_conversation(tmp_path, monkeypatch):
+    logger = ConversationLogger(str(tmp_path / 'chat.jsonl'))
+    monkeypatch.setattr(app_module, 'conversation_log', logger)
+    client = app.test_client()
+    client.post('/api/chat', json={'message': 'Python kaise sikhun?', 'personality': 'formal'})
+    logger.close()
+
+    record = json.loads((tmp_path / 'chat.jsonl').read_text(encoding='utf-8'))
+    assert record['message'] == 'Python kaise sikhun?'
+    assert record['personality'] == 'formal'
+    assert record['source'] == 'fallback'
+    assert record['latency_ms'] >= 0
+
+
+def test_chat_rate_limit(monkeypatch):
+    from admission import RateLimiter
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(rate=0.5, burst=1))
+    client = app.test_client()
+
+    assert client.post('/api/chat', json={'message': 'hello'}).status_code == 200
+    response = client.post('/api/chat', json={'message': 'hello'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+
+
+def test_chat_overload_is_shed_or_rejected(monkeypatch):
+    from admission import AdmissionController
+    client = app.test_client()
+
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0))
+    response = client.post('/api/chat', json={'message': 'Python kaise sikhun?'})
+    assert response.status_code == 200
+    assert 'Python' in response.json['response']
+
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0, overflow='reject'))
+    response = client.post('/api/chat', json={'message': 'Python kaise sikhun?'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_chat_stream_logs_conversation(tmp_path, monkeypatch):
+    logger = ConversationLogger(str(tmp_path / 'chat.jsonl'))
+    monkeypatch.setattr(app_module, 'conversation_log', logger)
+    client = app.test_client()
+    response = client.post('/api/chat/stream', json={'message': 'Python kaise sikhun?'})
+    response.get_data()
+    logger.close()
+
+    record = json.loads((tmp_path / 'chat.jsonl').read_text(encoding='utf-8'))
+    assert record['message'] == 'Python kaise sikhun?'
+    assert record['source'] == 'fallback'
+    assert record['latency_ms'] >= 0
+
+
+def test_chat_stream_is_gated(monkeypatch):
+    from admission import AdmissionController, RateLimiter
+    client = app.test_client()
+
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    monkeypatch.setattr(app_module, 'admission', controller)
+    response = client.post('/api/chat/stream', json={'message': 'Python kaise sikhun?'})
+    assert [event for event, _ in parse_events(response.get_data(as_text=True))][-1] == 'done'
+    response.close()
+    # The slot is released once the stream is closed
+    assert controller.stats()['in_flight'] == 0
+
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0))
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'Python kaise sikhun?'}).get_data(as_text=True))
+    assert 'Python' in events[0][1]['chunk']
+
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0, overflow='reject'))
+    assert client.post('/api/chat/stream', json={'message': 'hello'}).status_code == 429
+
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(rate=0.5, burst=1))
+    monkeypatch.setattr(app_module, 'admission', None)
+    assert client.post('/api/chat/stream', json={'message': 'hello'}).status_code == 200
+    assert client.post('/api/chat/stream', json={'message': 'hello'}).status_code == 429
+
+
+def test_chat_batch_is_gated(monkeypatch):
+    from admission import AdmissionController, RateLimiter
+    from providers import StubProvider
+    monkeypatch.setattr(app_module.chatbot, 'provider', StubProvider(latency=0))
+    client = app.test_client()
+
+    # Only messages that need the model wait for an admission slot
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0))
+    response = client.post('/api/chat/batch', json={'messages': ['Python kaise sikhun?', 'qzxv gate', '']})
+    assert [r['source'] for r in response.json['results']] == ['knowledge_base', 'shed', 'error']
+
+    # The request and each model call take a token; knowledge base answers are free
+    monkeypatch.setattr(app_module, 'rate_limiter', RateLimiter(rate=0.5, burst=3))
+    monkeypatch.setattr(app_module, 'admission', None)
+    messages = ['Python kaise sikhun?', 'qzxv 1', 'qzxv 2', 'qzxv 3']
+    response = client.post('/api/chat/batch', json={'messages': messages})
+    assert [r['source'] for r in response.json['results']] == ['knowledge_base', 'model', 'model', 'shed']
+    assert client.post('/api/chat/batch', json={'messages': ['hello']}).status_code == 429
+
+
+def test_chat_stream():
+    client = app.test_client()
+    response = client.post('/api/chat/stream', json={'message': 'Python kaise sikhun?'})
+
+    assert response.mimetype == 'text/event-stream'
+    events = parse_events(response.get_data(as_text=True))
+    assert events[0][0] == 'message' and 'Python' in events[0][1]['chunk']
+    assert events[-1][0] == 'done'
+
+
+def test_chat_stream_empty_message():
+    client = app.test_client()
+    assert client.post('/api/chat/stream', json={'message': '  '}).status_code == 400
+
+
+def test_chat_batch():
+    client = app.test_client()
+    messages = ['Python kaise sikhun?', 'python  KAISE sikhun?', '', 'xyz']
+    response = client.post('/api/chat/batch', json={'messages': messages})
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r['message'] for r in results] == messages
+    assert results[0]['response'] == results[1]['response']
+    assert results[0]['source'] == 'knowledge_base'
+    assert results[2]['success'] is False and results[2]['error'] == 'Empty message'
+    assert results[3]['source'] == 'fallback'
+
+
+def test_chat_batch_rejects_bad_payload():
+    client = app.test_client()
+    assert client.post('/api/chat/batch', json={'messages': 'hello'}).status_code == 400
+    assert client.post('/api/chat/batch', json={'messages': ['hi'] * 101}).status_code == 400
+
+
+def test_metrics():
+    client = app.test_client()
+    client.post('/api/chat', json={'message': 'Python kaise sikhun?', 'personality': 'formal'})
+    response = client.get('/api/metrics')
+
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    for stage in ('request_parse', 'cache_lookup', 'fallback_match', 'json_serialization'):
+        assert f'chatbot_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'chatbot_responses_total{personality="formal",source="fallback"}' in text
+    assert 'chatbot_request_seconds_count{endpoint="/api/chat",status="200"}' in text
+
+
+def test_admin_reload_checks_token(monkeypatch):
+    client = app.test_client()
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', None)
+    assert client.post('/api/admin/reload').status_code == 404
+
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 's3cret')
+    assert client.post('/api/admin/reload').status_code == 403
+    assert client.post('/api/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.post('/api/admin/reload', headers={'X-Admin-Token': 's3cret'}).status_code == 200
+
+
+def test_ready():
+    client = app.test_client()
+    assert client.get('/api/ready').status_code == 200
+
+    app_module.draining.set()
+    try:
+        response = client.get('/api/ready')
+        assert response.status_code == 503
+        assert response.get_json()['draining'] is True
+    finally:
+        app_module.draining.clear()
+
+
+if __name__ == "__main__":
+    app_module.chatbot.provider = None
+    test_chat()
+    test_chat_stream()
+    test_chat_stream_empty_message()
+    test_chat_batch()
+    test_chat_batch_rejects_bad_payload()
+    test_metrics()
+    test_ready()
+    print("✅ All API tests passed!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the ASGI chat route"""
+
+import asyncio
+import json
+
+import pytest
+
+import asgi as asgi_module
+from asgi import app
+from metrics import REQUEST_SECONDS
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """Answer from the knowledge base, even where the Gemini SDK and an API key are present"""
+    monkeypatch.setattr(asgi_module.chatbot, 'provider', None)
+
+
+def call(method, path, payload=None):
+    """Run one request through the ASGI app and return (status, json body, headers)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': [], 'client': ('127.0.0.1', 50000)}
+    asyncio.run(app(scope, receive, send))
+    response_body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+    headers = {key.decode('ascii'): value.decode('ascii') for key, value in sent[0]['headers']}
+    return sent[0]['status'], json.loads(response_body) if response_body else None, headers
+
+
+def test_chat():
+    before = REQUEST_SECONDS.count('/api/chat', '200')
+    status, data, _ = call('POST', '/api/chat', {'message': 'Python kaise sikhun?'})
+    assert status == 200
+    assert data['success'] and 'Python' in data['response']
+    assert REQUEST_SECONDS.count('/api/chat', '200') == before + 1
+
+
+def test_chat_rate_limit(monkeypatch):
+    from admission import RateLimiter
+    monkeypatch.setattr(asgi_module, 'rate_limiter', RateLimiter(rate=0.5, burst=1))
+
+    assert call('POST', '/api/chat', {'message': 'hello'})[0] == 200
+    status, _, headers = call('POST', '/api/chat', {'message': 'hello'})
+    assert status == 429
+    assert headers['retry-after'] == '2'
+
+
+def test_chat_overload_is_shed_or_rejected(monkeypatch):
+    from admission import AdmissionController
+
+    monkeypatch.setattr(asgi_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0))
+    status, data, _ = call('POST', '/api/chat', {'message': 'Python kaise sikhun?'})
+    assert status == 200
+    assert 'Python' in data['response']
+
+    monkeypatch.setattr(asgi_module, 'admission', AdmissionController(max_in_flight=0, max_queue=0, overflow='reject'))
+    status, _, headers = call('POST', '/api/chat', {'message': 'Python kaise sikhun?'})
+    assert status == 429
+    assert int(headers['retry-after']) >= 1
+
+
+def test_chat_releases_admission_slot(monkeypatch):
+    from admission import AdmissionController
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    monkeypatch.setattr(asgi_module, 'admission', controller)
+
+    assert call('POST', '/api/chat', {'message': 'hello'})[0] == 200
+    assert controller.in_flight == 0
+
+
+def test_chat_empty_message():
+    assert call('POST', '/api/chat', {'message': ''})[0] == 400
+
+
+def test_chat_preflight():
+    assert call('OPTIONS', '/api/chat')[0] == 204
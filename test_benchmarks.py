@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the benchmark helpers and the load generator"""
+
+import json
+
+from bench_common import compare, percentile, summarize, write_results
+from bench_load import plan_requests, run_load, start_local_server
+from providers import StubProvider
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_reports_milliseconds():
+    summary = summarize([0.001, 0.002, 0.010])
+    assert summary['count'] == 3
+    assert summary['p50_ms'] == 2.0
+    assert summary['max_ms'] == 10.0
+
+
+def test_plan_is_deterministic():
+    plan = plan_requests(rate=50, duration=2, seed=7)
+    assert plan == plan_requests(rate=50, duration=2, seed=7)
+    assert len(plan) == 100
+    assert {kind for _, kind, _ in plan} == {'popular', 'novel', 'session'}
+    assert all('session_id' in payload for _, kind, payload in plan if kind == 'session')
+    assert plan[-1][0] < 2
+
+
+def test_load_run_against_stub(tmp_path):
+    base_url, stop = start_local_server(StubProvider(latency=0.001))
+    try:
+        results = run_load(base_url, plan_requests(rate=200, duration=0.25, seed=1), concurrency=8)
+    finally:
+        stop()
+
+    assert results['requests'] == 50
+    assert results['errors'] == 0
+    assert results['throughput_rps'] > 0
+    assert results['latency']['p99_ms'] >= results['latency']['p50_ms']
+
+    path = tmp_path / 'load.json'
+    write_results(str(path), 'load', {'rate': 200}, results)
+    document = json.loads(path.read_text())
+    assert document['benchmark'] == 'load'
+    assert document['results']['requests'] == 50
+    assert 'python' in document['environment']
+
+
+def test_compare_prints_changes(tmp_path, capsys):
+    path = tmp_path / 'baseline.json'
+    write_results(str(path), 'engine', {}, {'build_prompt': {'median_us': 10.0}})
+    compare({'build_prompt': {'median_us': 12.0}}, str(path))
+    assert '+20.0%' in capsys.readouterr().out
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for ChatbotEngine with a fake Gemini model"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import providers
+from chatbot_engine import ChatbotEngine
+from providers import GeminiProvider, StubProvider
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel"""
+
+    def __init__(self, chunks=('Namaste', ' duniya'), fail_after=None):
+        self.chunks = list(chunks)
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        if self.fail_after == 0:
+            raise RuntimeError('model down')
+        if not stream:
+            return FakeChunk(''.join(self.chunks))
+        return self._stream()
+
+    def _stream(self):
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise RuntimeError('stream broken')
+            yield FakeChunk(chunk)
+
+
+def make_engine(model):
+    return ChatbotEngine(provider=GeminiProvider(model=model))
+
+
+def test_stream_response_yields_model_chunks():
+    bot = make_engine(FakeModel())
+    assert list(bot.stream_response('hello')) == ['Namaste', ' duniya']
+
+
+def test_stream_response_falls_back_without_model():
+    bot = ChatbotEngine()
+    bot.provider = None
+    chunks = list(bot.stream_response('Python kaise sikhun?'))
+    assert len(chunks) == 1 and 'Python' in chunks[0]
+
+
+def test_stream_response_falls_back_when_model_fails():
+    bot = make_engine(FakeModel(fail_after=0))
+    chunks = list(bot.stream_response('Python kaise sikhun?'))
+    assert len(chunks) == 1 and 'Python' in chunks[0]
+
+
+def test_stream_response_stops_on_mid_stream_error():
+    bot = make_engine(FakeModel(chunks=['a', 'b', 'c'], fail_after=2))
+    assert list(bot.stream_response('hello')) == ['a', 'b']
+
+
+def test_get_response_caches_model_answers():
+    model = FakeModel()
+    bot = make_engine(model)
+
+    assert bot.get_response('Hello  there') == 'Namaste duniya'
+    assert bot.get_response('hello there') == 'Namaste duniya'
+    assert model.calls == 1
+    assert bot.get_response('hello there', 'formal') == 'Namaste duniya'
+    assert model.calls == 2
+    assert bot.response_cache.stats()['hits'] == 1
+
+
+def test_stream_response_uses_cache():
+    model = FakeModel()
+    bot = make_engine(model)
+
+    assert list(bot.stream_response('hello')) == ['Namaste', ' duniya']
+    assert list(bot.stream_response('hello')) == ['Namaste duniya']
+    assert model.calls == 1
+
+
+class SlowModel(FakeModel):
+    """Fake model that sleeps and records peak concurrency"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return super().generate_content(prompt, generation_config, stream)
+
+
+def test_aget_response_returns_model_answer():
+    bot = make_engine(FakeModel())
+    assert asyncio.run(bot.aget_response('hello')) == 'Namaste duniya'
+
+
+def test_aget_response_degrades_on_deadline():
+    bot = make_engine(SlowModel(delay=0.2))
+    response = asyncio.run(bot.aget_response('Python kaise sikhun?', timeout=0.01))
+    assert 'Python' in response and response != 'Namaste duniya'
+
+
+def test_aget_response_caps_concurrency():
+    model = SlowModel(delay=0.02)
+    bot = make_engine(model)
+    bot.max_concurrency = 3
+
+    async def run_all():
+        return await asyncio.gather(*(bot.aget_response(f'question {i}', timeout=5) for i in range(12)))
+
+    assert asyncio.run(run_all()) == ['Namaste duniya'] * 12
+    assert model.peak <= 3
+
+
+class PromptRecorder(FakeModel):
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.prompt = prompt
+        self.generation_config = generation_config
+        return super().generate_content(prompt, generation_config, stream)
+
+
+def test_session_history_reaches_prompt():
+    model = PromptRecorder()
+    bot = make_engine(model)
+
+    bot.get_response('Python kya hai?', session_id='abc')
+    assert 'Conversation so far' not in model.prompt
+
+    bot.get_response('aur batao', session_id='abc')
+    assert 'User: Python kya hai?\nAssistant: Namaste duniya' in model.prompt
+    assert model.calls == 2
+
+
+def test_get_responses_fans_out_and_dedupes():
+    model = SlowModel(delay=0.02)
+    bot = make_engine(model)
+    bot.max_concurrency = 4
+
+    messages = [f'question {i}' for i in range(8)] + ['Question 0', 'Python kaise sikhun?']
+    results = bot.get_responses(messages)
+
+    assert model.calls == 8
+    assert model.peak <= 4
+    assert [r['source'] for r in results] == ['model'] * 9 + ['knowledge_base']
+    assert results[8]['message'] == 'Question 0'
+
+
+def test_get_responses_reports_item_errors():
+    bot = make_engine(FakeModel(fail_after=0))
+    results = bot.get_responses(['xyz', None])
+
+    assert results[0]['source'] == 'fallback' and results[0]['error'] == 'model down'
+    assert results[1]['success'] is False
+
+
+def test_get_responses_times_out_to_fallback():
+    bot = make_engine(SlowModel(delay=0.2))
+    bot.model_timeout = 0.01
+    result = bot.get_responses(['xyz'])[0]
+
+    assert result['source'] == 'fallback' and 'timeout' in result['error']
+
+
+def test_import_and_offline_answers_skip_sdk():
+    code = (
+        "import sys, chatbot_engine\n"
+        "bot = chatbot_engine.ChatbotEngine()\n"
+        "bot._fallback_response('Python kaise sikhun?')\n"
+        "assert 'google.generativeai' not in sys.modules\n"
+        "assert 'asyncio' not in sys.modules\n"
+        "assert chatbot_engine.create_provider.__module__ == 'providers'\n"
+        "import providers\n"
+        "assert providers.GENAI_AVAILABLE is None\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, '-c', code], cwd=here, check=True)
+
+
+def test_model_is_created_on_first_use(monkeypatch):
+    monkeypatch.setattr(providers, 'GENAI_AVAILABLE', False)
+    provider = GeminiProvider(api_key='key')
+    assert provider._model_ready is False
+    assert provider.available() is False
+    assert provider._model_ready is True
+
+
+def test_stub_provider_drives_engine():
+    def run():
+        bot = ChatbotEngine(provider=StubProvider(latency=0, failure_rate=0.5, seed=3))
+        bot.response_cache = None
+        return [bot.get_response(f'question {i}') for i in range(20)]
+
+    answers = run()
+    stubbed = [answer for answer in answers if answer.startswith('Stub answer')]
+
+    assert 0 < len(stubbed) < 20
+    assert run() == answers
+
+
+def test_circuit_breaker_skips_failing_model():
+    from circuit_breaker import OPEN, CircuitBreaker
+
+    model = FakeModel(fail_after=0)
+    bot = ChatbotEngine(
+        provider=GeminiProvider(model=model),
+        circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    )
+    bot.response_cache = None
+    answers = [bot.get_response('Python kaise sikhun?') for _ in range(10)]
+
+    assert model.calls == 3
+    assert bot.circuit_breaker.state == OPEN
+    assert all('Python' in answer for answer in answers)
+    assert list(bot.stream_response('Python kaise sikhun?'))
+    assert model.calls == 3
+
+
+def test_identical_concurrent_requests_share_a_model_call():
+    model = SlowModel(delay=0.2)
+    bot = make_engine(model)
+    bot.response_cache = None
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        answers = list(pool.map(lambda _: bot.get_response('Python kaise sikhun?'), range(6)))
+
+    assert model.calls == 1
+    assert answers == ['Namaste duniya'] * 6
+    assert bot.single_flight.stats()['coalesced'] == 5
+
+
+def test_batch_shares_a_model_call_with_single_requests():
+    model = SlowModel(delay=0.2)
+    bot = make_engine(model)
+    bot.response_cache = None
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        single = pool.submit(bot.get_response, 'xyz')
+        time.sleep(0.05)
+        result = bot.get_responses(['xyz'])[0]
+
+    assert single.result() == result['response'] == 'Namaste duniya'
+    assert model.calls == 1
+
+
+def test_batch_admits_each_model_call():
+    bot = make_engine(FakeModel())
+    admitted, released = [], []
+
+    def admit():
+        if len(admitted) == 2:
+            return None
+        admitted.append(1)
+        return lambda: released.append(1)
+
+    results = bot.get_responses(['Python kaise sikhun?', 'xyz 1', 'xyz 2', 'xyz 3'], admit=admit)
+
+    assert [r['source'] for r in results] == ['knowledge_base', 'model', 'model', 'shed']
+    assert len(released) == 2
+
+
+def test_model_calls_carry_personality_output_cap(monkeypatch):
+    monkeypatch.setenv('CHATBOT_MAX_OUTPUT_TOKENS_FORMAL', '200')
+    model = PromptRecorder()
+    bot = make_engine(model)
+
+    bot.get_response('Python kya hai?', 'formal')
+    assert model.generation_config['max_output_tokens'] == 200
+    assert model.generation_config['temperature'] == ChatbotEngine.GENERATION_CONFIG['temperature']
+
+    bot.get_response('JavaScript kya hai?', 'friendly')
+    assert model.generation_config['max_output_tokens'] == 1024
+
+
+def test_precomputed_snapshot_answers_skip_the_model(tmp_path):
+    from answer_snapshot import AnswerSnapshot, write_snapshot
+    from precompute import precompute
+
+    builder = make_engine(FakeModel())
+    builder.response_cache = None
+    answers, sources = precompute(builder, ['Python kaise sikhun?'], ['friendly', 'formal'])
+    assert sources == {'model': 2}
+    write_snapshot(str(tmp_path / 'answers.snapshot'), answers)
+
+    model = FakeModel(chunks=['fresh'])
+    bot = ChatbotEngine(
+        provider=GeminiProvider(model=model),
+        answer_snapshot=AnswerSnapshot(str(tmp_path / 'answers.snapshot'))
+    )
+    bot.response_cache = None
+
+    assert bot.get_response_with_source('python  KAISE sikhun?', 'formal') == ('Namaste duniya', 'snapshot')
+    assert list(bot.stream_response('Python kaise sikhun?')) == ['Namaste duniya']
+    assert asyncio.run(bot.aget_response('Python kaise sikhun?')) == 'Namaste duniya'
+    assert bot.get_responses(['Python kaise sikhun?'])[0]['source'] == 'snapshot'
+    assert model.calls == 0
+    # Personalities missing from the snapshot still reach the model
+    assert bot.get_response('Python kaise sikhun?', 'professional') == 'fresh'
+
+
+def test_stream_response_reports_sources():
+    bot = make_engine(FakeModel())
+    assert list(bot.stream_response_with_source('hello')) == [('Namaste', 'model'), (' duniya', 'model')]
+    assert list(bot.stream_response_with_source('hello')) == [('Namaste duniya', 'cache')]
+
+
+def test_prompt_usage_only_for_model_answers():
+    bot = make_engine(FakeModel())
+    response, source, usage = bot.get_response_with_usage('hello')
+    assert (response, source) == ('Namaste duniya', 'model')
+    assert usage['max_output_tokens'] > 0
+    assert bot.get_response_with_usage('hello') == ('Namaste duniya', 'cache', None)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the model circuit breaker"""
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(**kwargs):
+    clock = FakeClock()
+    options = dict(failure_threshold=3, error_rate=0.5, window=10, min_calls=4, reset_timeout=10, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker(**options), clock
+
+
+def test_opens_after_consecutive_failures():
+    breaker, _ = make_breaker()
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats()['rejected'] == 1
+    assert breaker.stats()['retry_in'] == 10
+
+
+def test_opens_on_error_rate():
+    breaker, _ = make_breaker(failure_threshold=100)
+    for success in (True, False, True, False):
+        breaker.record_success() if success else breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()['recent_error_rate'] == 0.5
+
+
+def test_error_rate_needs_min_calls():
+    breaker, _ = make_breaker(failure_threshold=100)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['consecutive_failures'] == 0
+
+
+def test_half_open_probe_failure_reopens():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()['opens'] == 2
+
+    clock.now = 15
+    assert not breaker.allow_request()
+
+
+def test_unrecorded_probe_frees_its_slot():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.allow_request()
+    clock.now = 20
+    assert breaker.allow_request()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the batched JSONL conversation logger"""
+
+import gzip
+import json
+import os
+import threading
+
+from conversation_log import ConversationLogger
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    path = tmp_path / 'chat.jsonl'
+    logger = ConversationLogger(str(path))
+    assert logger.log('Python kya hai?', 'friendly', 'model', 0.25)
+    assert logger.log('नमस्ते', 'formal', 'fallback', 0.001, status=200)
+    assert logger.flush()
+
+    records = read_records(path)
+    assert [r['message'] for r in records] == ['Python kya hai?', 'नमस्ते']
+    assert records[0]['source'] == 'model'
+    assert records[0]['latency_ms'] == 250.0
+    assert records[1]['status'] == 200
+    assert logger.stats()['written'] == 2
+    logger.close()
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    logger = ConversationLogger(str(tmp_path / 'chat.jsonl'), queue_size=2, batch_size=1)
+    # Hold the writer back so the queue fills up
+    release = threading.Event()
+    logger._write = lambda records: release.wait(5)
+
+    results = [logger.log(f'message {i}', 'friendly', 'cache', 0.0) for i in range(10)]
+
+    # At most one record is with the writer and two are queued
+    assert results.count(False) >= 7
+    assert logger.stats()['dropped'] == results.count(False)
+    release.set()
+    logger.close()
+
+
+def test_rotation_compresses_and_keeps_backups(tmp_path):
+    path = tmp_path / 'chat.jsonl'
+    logger = ConversationLogger(str(path), max_bytes=200, backups=2, batch_size=1)
+    for i in range(13):
+        logger.log(f'message number {i}', 'friendly', 'model', 0.01)
+        assert logger.flush()
+    logger.close()
+
+    assert logger.stats()['rotations'] >= 3
+    assert sorted(os.listdir(tmp_path)) == ['chat.jsonl', 'chat.jsonl.1.gz', 'chat.jsonl.2.gz']
+    with gzip.open(tmp_path / 'chat.jsonl.1.gz', 'rt', encoding='utf-8') as f:
+        rotated = [json.loads(line) for line in f]
+    # The newest backup holds the records just before the current file
+    current = read_records(path)
+    numbers = [int(r['message'].split()[-1]) for r in rotated + current]
+    assert numbers == sorted(numbers)
+    assert numbers[-1] == 12
+
+
+def test_close_writes_pending_records(tmp_path):
+    path = tmp_path / 'chat.jsonl'
+    logger = ConversationLogger(str(path), flush_interval=10)
+    for i in range(100):
+        logger.log(f'message {i}', 'friendly', 'cache', 0.0)
+    logger.close()
+
+    assert len(read_records(path)) == 100
+    assert not logger.log('late', 'friendly', 'cache', 0.0)
+
+
+def test_pid_in_path_and_missing_directory(tmp_path):
+    logger = ConversationLogger(str(tmp_path / 'logs' / 'chat-{pid}.jsonl'))
+    logger.log('hello', 'friendly', 'cache', 0.0)
+    logger.close()
+
+    assert os.path.exists(tmp_path / 'logs' / f'chat-{os.getpid()}.jsonl')
+
+    # Already per process, so the path is kept
+    assert logger.per_process() is False
+
+
+def test_per_process_adds_pid_to_a_shared_path(tmp_path):
+    logger = ConversationLogger(str(tmp_path / 'chat.jsonl'))
+
+    assert logger.per_process() is True
+    assert logger.path == str(tmp_path / f'chat.{os.getpid()}.jsonl')
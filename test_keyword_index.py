@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the compiled keyword index"""
+
+import random
+
+from keyword_index import KeywordIndex
+from chatbot_engine import ChatbotEngine
+
+
+def test_matches_substrings():
+    index = KeywordIndex([('hi', 'greeting'), ('ml', 'ml'), ('html', 'web'), ('machine learning', 'ml')])
+
+    assert index.search('html basics') == {'ml', 'web'}
+    assert index.search('machine learning') == {'greeting', 'ml'}
+    assert index.search('python') == set()
+
+
+def test_same_as_substring_scan():
+    rng = random.Random(7)
+    keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(50)]
+    index = KeywordIndex((keyword, keyword) for keyword in keywords)
+
+    for _ in range(500):
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 20)))
+        assert index.search(text) == {keyword for keyword in keywords if keyword in text}
+
+
+def test_rebuild_after_add():
+    index = KeywordIndex([('hi', 'greeting'), ('machine', 'ml')])
+    index.add('chi', 'chi')
+    index.build()
+    index.add('ne', 'ne')
+
+    assert index.search('machine') == {'greeting', 'ml', 'chi', 'ne'}
+    # Inherited tags are merged once, however often the index is rebuilt
+    assert all(len(set(tags)) == len(tags) for tags in index._out)
+
+
+def test_engine_routing():
+    bot = ChatbotEngine()
+
+    assert bot._fallback_response("Python kaise sikhun?").startswith("Python")
+    assert bot._fallback_response("JavaScript kaise seekhun?").startswith("JavaScript sikho")
+    assert bot._fallback_response("What is ML?").startswith("Machine Learning kya hai?")
+    assert bot._fallback_response("API kya hota hai").startswith("API")
+    assert bot._fallback_response("salary kitni hai").startswith("Tech Career Guide")
+    assert "Interesting question" in bot._fallback_response("xyz")
+
+
+def test_engine_knowledge_base_cascade():
+    bot = ChatbotEngine()
+    kb = bot.knowledge_base
+
+    # No intent word in these, so the categories answer
+    assert bot._fallback_response("shukriya") in kb['greetings']['responses']
+    assert bot._fallback_response("react frontend") in kb['web_development']['responses']['frontend']
+    assert bot._fallback_response("neural data") in kb['ai_ml']['responses']['data science']
+    assert bot._fallback_response("pytorch or tensorflow") in bot.kb.category_answers['ai_ml']
+
+
+if __name__ == "__main__":
+    test_matches_substrings()
+    test_same_as_substring_scan()
+    test_rebuild_after_add()
+    test_engine_routing()
+    test_engine_knowledge_base_cascade()
+    print("✅ All keyword index tests passed!")
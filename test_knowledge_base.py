@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the compiled knowledge base and hot reload"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from chatbot_engine import ChatbotEngine
+from knowledge_base import DEFAULT_PATH, KnowledgeBase, render
+
+
+def write_kb(path, data, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_default_file_compiles():
+    kb = KnowledgeBase.load(DEFAULT_PATH)
+    stats = kb.stats()
+
+    assert stats['categories'] == 5 and stats['intents'] == 4
+    assert ('intent', 'learn') in kb.search('Python kaise sikhun?')
+    assert ('topic', 'ai_ml', ('data science',)) in kb.search('Data Science')
+
+
+def test_templates_are_presplit():
+    kb = KnowledgeBase.load(DEFAULT_PATH)
+    template = kb.unknown_responses[0]
+
+    assert isinstance(template, tuple)
+    assert render(template, 'xyz').startswith("'xyz' - Interesting question!")
+
+
+def test_invalid_data_raises_value_error():
+    with pytest.raises(ValueError):
+        KnowledgeBase({'categories': {'x': {'keywords': ['a']}}})
+
+
+def test_engine_reloads_changed_file(tmp_path):
+    path = str(tmp_path / 'kb.json')
+    shutil.copy(DEFAULT_PATH, path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    bot = ChatbotEngine()
+    bot.kb_path = path
+    bot.reload_knowledge_base()
+    bot.kb_reload_interval = 0.001
+
+    data['intents'].insert(0, {'name': 'rust', 'words': ['rust'], 'responses': ['Rust bhi seekho!']})
+    write_kb(path, data, bot.kb.mtime + 10**9)
+    bot._next_kb_check = 0
+
+    assert bot._fallback_response('rust kaise sikhun?') == 'Rust bhi seekho!'
+
+
+def test_reloaded_categories_drive_answers(tmp_path):
+    path = str(tmp_path / 'kb.json')
+    with open(DEFAULT_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    data['categories']['web_development']['responses']['frontend'] = ['Frontend ke liye React seekho!']
+    data['categories']['devops'] = {'keywords': ['docker'], 'responses': ['Docker containers banao!']}
+    write_kb(path, data, 10**18)
+
+    bot = ChatbotEngine()
+    bot.kb_path = path
+    bot.reload_knowledge_base()
+
+    assert bot._fallback_response('react frontend') == 'Frontend ke liye React seekho!'
+    assert bot._fallback_response('docker setup') == 'Docker containers banao!'
+
+
+def test_failed_reload_keeps_current_kb(tmp_path):
+    path = str(tmp_path / 'kb.json')
+    with open(path, 'w') as f:
+        f.write('{not json')
+
+    bot = ChatbotEngine()
+    kb = bot.kb
+    bot.kb_path = path
+    with pytest.raises(ValueError):
+        bot.reload_knowledge_base()
+    bot._next_kb_check = 0
+    bot.kb_reload_interval = 1
+
+    assert bot._current_kb() is kb
+    assert 'Python' in bot._fallback_response('Python kaise sikhun?')
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the fixed-memory metrics registry"""
+
+from metrics import Registry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency', labels=('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, 'model')
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{stage="model",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="model",le="1"} 3' in text
+    assert 'latency_seconds_bucket{stage="model",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{stage="model"} 6.05' in text
+    assert 'latency_seconds_count{stage="model"} 4' in text
+
+
+def test_histogram_memory_is_fixed():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency')
+    for i in range(10000):
+        histogram.observe(i / 1000)
+
+    assert len(histogram._series[()]) == len(histogram.buckets) + 2
+    assert histogram.count() == 10000
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    counter = registry.counter('responses', 'Responses', labels=('personality', 'source'))
+    counter.inc('friendly', 'model')
+    counter.inc('friendly', 'model')
+    registry.gauge('sessions', 'Sessions', lambda: 3)
+
+    text = registry.render()
+    assert '# TYPE responses counter' in text
+    assert 'responses_total{personality="friendly",source="model"} 2' in text
+    assert 'sessions 3' in text
+
+
+def test_registering_twice_returns_same_metric():
+    registry = Registry()
+    assert registry.counter('a', 'A') is registry.counter('a', 'A')
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for personality styling of whole and streamed responses"""
+
+import random
+
+import pytest
+
+from chatbot_engine import ChatbotEngine
+from postprocess import FORMAL_SUBSTITUTIONS, ResponseFormatter
+
+SAMPLES = [
+    "Acha, tum pucha: 'Python?' - Ye bahut interesting sawal hai! 🤔 Kya tum aur details de sakte ho?",
+    "  Hey there! 👋 Main yahan hoon 😊\n\n• Python → 🐍 basics\n• ML 🚀🚀 projects  ",
+    "Family 👨‍👩‍👧 aur flag 🇮🇳, thumbs 👍🏽 aur star ⭐ - tumhara sawal accha hai ✨",
+    "😊",
+    "",
+]
+
+FORMATTERS = {
+    'plain': ResponseFormatter(),
+    'emoji': ResponseFormatter(strip_emoji=True),
+    'formal': ResponseFormatter(strip_emoji=True, substitutions=FORMAL_SUBSTITUTIONS),
+    'creative': ResponseFormatter(prefix='✨ '),
+}
+
+
+def stream(formatter, chunks):
+    out = formatter.stream()
+    return [piece for piece in [out.feed(chunk) for chunk in chunks] + [out.finish()] if piece]
+
+
+def test_formal_style():
+    formatter = FORMATTERS['formal']
+    assert formatter.format(SAMPLES[0]) == (
+        "Well, you pucha: 'Python?' - Ye bahut interesting sawal hai!  Kya you aur details de sakte ho?"
+    )
+    # Plain substring replacement, as str.replace does; nothing else is rewritten
+    assert formatter.format('tumhara Hey! Tum') == 'youhara Hey! Tum'
+
+
+def test_emoji_removal_covers_sequences():
+    formatter = FORMATTERS['emoji']
+    assert formatter.format(SAMPLES[2]) == (
+        "Family  aur flag , thumbs  aur star  - tumhara sawal accha hai"
+    )
+    # Bullets and arrows are text, not emoji
+    assert formatter.format(SAMPLES[1]) == "Hey there!  Main yahan hoon \n\n• Python →  basics\n• ML  projects"
+    assert formatter.format(SAMPLES[3]) == ''
+
+
+def test_prefix_only_for_non_empty_answers():
+    assert FORMATTERS['creative'].format('  hi ') == '✨ hi'
+    assert FORMATTERS['creative'].format('   ') == ''
+
+
+@pytest.mark.parametrize('name', FORMATTERS)
+def test_stream_matches_whole_response_at_every_split(name):
+    formatter = FORMATTERS[name]
+    for text in SAMPLES:
+        expected = formatter.format(text)
+        for cut in range(len(text) + 1):
+            assert ''.join(stream(formatter, [text[:cut], text[cut:]])) == expected
+
+
+@pytest.mark.parametrize('name', FORMATTERS)
+def test_stream_matches_whole_response_for_random_chunks(name):
+    formatter = FORMATTERS[name]
+    rng = random.Random(7)
+    for text in SAMPLES:
+        for _ in range(50):
+            chunks, rest = [], text
+            while rest:
+                size = rng.randint(1, 6)
+                chunks.append(rest[:size])
+                rest = rest[size:]
+            assert ''.join(stream(formatter, chunks)) == formatter.format(text)
+
+
+def test_stream_emits_before_the_end():
+    chunks = stream(FORMATTERS['formal'], ['Acha, t', 'um kaise ', 'ho? 😊', ' Bye'])
+    assert chunks[:2] == ['Well,', ' you kaise']
+    assert ''.join(chunks) == 'Well, you kaise ho?  Bye'
+
+
+def test_engine_styles_streamed_model_output():
+    from providers import StubProvider
+
+    class SplitProvider(StubProvider):
+        def stream(self, prompt, generation_config=None):
+            yield from ['Acha, tu', 'm ne ', 'pucha 🤔', ' 👍', 'ok']
+
+    bot = ChatbotEngine(provider=SplitProvider(latency=0))
+    bot.response_cache = None
+    assert ''.join(bot.stream_response('hello', 'formal')) == 'Well, you ne pucha  ok'
+    assert ''.join(bot.stream_response('hello', 'friendly')) == 'Acha, tum ne pucha 🤔 👍ok'
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for precompiled prompt templates and token budgets"""
+
+from prompt_builder import PromptBuilder, create_prompt_builder
+from session_store import MODEL, USER, estimate_tokens
+
+STYLES = {
+    'friendly': {'tone': 'casual and friendly'},
+    'formal': {'tone': 'respectful and formal', 'max_output_tokens': 300},
+}
+CONFIG = {'temperature': 0.7}
+
+
+def test_templates_are_compiled_per_personality():
+    builder = PromptBuilder(STYLES, CONFIG, default_output_tokens=800)
+    prompt = builder.build('Python kya hai?', 'formal')
+
+    assert 'Your tone should be: respectful and formal' in prompt
+    assert prompt.endswith('User message: Python kya hai?\n\nProvide a comprehensive and helpful response:')
+    assert builder.template('formal').generation_config == {'temperature': 0.7, 'max_output_tokens': 300}
+    assert builder.template('friendly').max_output_tokens == 800
+    assert builder.template('unknown') is builder.template('friendly')
+
+
+def test_history_is_included():
+    builder = PromptBuilder(STYLES, CONFIG)
+    prompt = builder.build('aur batao', 'friendly', [(USER, 'Python?'), (MODEL, 'Ek language')])
+    assert 'Conversation so far:\nUser: Python?\nAssistant: Ek language\n\nUser message: aur batao' in prompt
+
+
+def test_long_messages_are_truncated_to_budget():
+    builder = PromptBuilder(STYLES, CONFIG, max_message_tokens=50)
+    message = 'python ' * 200
+
+    truncated, was_truncated = builder.truncate(message)
+    assert was_truncated
+    assert estimate_tokens(truncated) <= 50
+    assert truncated.endswith('[...]')
+    assert builder.truncate('short')[1] is False
+    assert message not in builder.build(message, 'friendly')
+
+
+def test_usage_matches_built_prompt():
+    builder = PromptBuilder(STYLES, CONFIG, max_message_tokens=50)
+    history = [(USER, 'Python?'), (MODEL, 'Ek language')]
+    usage = builder.usage('python ' * 200, 'formal', history)
+
+    assert usage['message_truncated'] is True
+    assert usage['max_output_tokens'] == 300
+    prompt_tokens = estimate_tokens(builder.build('python ' * 200, 'formal', history))
+    assert usage['prompt_tokens'] == prompt_tokens
+
+
+def test_environment_overrides(monkeypatch):
+    monkeypatch.setenv('CHATBOT_MAX_MESSAGE_TOKENS', '64')
+    monkeypatch.setenv('CHATBOT_MAX_OUTPUT_TOKENS', '500')
+    monkeypatch.setenv('CHATBOT_MAX_OUTPUT_TOKENS_FRIENDLY', '150')
+    builder = create_prompt_builder(STYLES, CONFIG)
+
+    assert builder.max_message_tokens == 64
+    assert builder.template('friendly').max_output_tokens == 150
+    assert builder.template('formal').max_output_tokens == 300
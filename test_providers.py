@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the LLM provider layer"""
+
+import threading
+
+import pytest
+
+from providers import HTTPProvider, ProviderError, StubProvider, create_provider
+from stub_server import make_server
+
+
+def test_stub_is_deterministic():
+    def draws(seed):
+        provider = StubProvider(latency=0.1, jitter=0.05, distribution='lognormal', failure_rate=0.3, seed=seed)
+        return [provider._draw() for _ in range(50)]
+
+    assert draws(1) == draws(1)
+    assert draws(1) != draws(2)
+
+
+def test_stub_latency_and_failures():
+    slept = []
+    provider = StubProvider(latency=0.2, failure_rate=1.0, sleep=slept.append)
+
+    with pytest.raises(ProviderError):
+        provider.generate('User message: hello')
+    assert slept == [0.2]
+
+
+def test_stub_stream_chunks():
+    provider = StubProvider(latency=0, chunk_size=10)
+    prompt = 'intro\nUser message: hello\n\nProvide a response:'
+
+    assert ''.join(provider.stream(prompt)) == provider.answer(prompt)
+    assert "'hello'" in provider.answer(prompt)
+
+
+def test_http_provider_against_stub_server():
+    server = make_server(StubProvider(latency=0), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/generate'
+        assert 'hello' in HTTPProvider(url).generate('User message: hello')
+
+        failing = make_server(StubProvider(latency=0, failure_rate=1.0), port=0)
+        threading.Thread(target=failing.serve_forever, daemon=True).start()
+        with pytest.raises(ProviderError):
+            HTTPProvider(f'http://127.0.0.1:{failing.server_address[1]}/generate').generate('x')
+        failing.shutdown()
+    finally:
+        server.shutdown()
+
+
+def test_create_provider_from_env(monkeypatch):
+    monkeypatch.setenv('CHATBOT_PROVIDER', 'stub')
+    monkeypatch.setenv('CHATBOT_STUB_LATENCY_MS', '5')
+    provider = create_provider()
+    assert isinstance(provider, StubProvider) and provider.latency == 0.005
+
+    monkeypatch.setenv('CHATBOT_PROVIDER', 'none')
+    assert create_provider() is None
+
+    monkeypatch.setenv('CHATBOT_PROVIDER', 'bogus')
+    with pytest.raises(ValueError):
+        create_provider()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the response cache and its backends"""
+
+import time
+
+from response_cache import MemoryBackend, ResponseCache, SQLiteBackend
+
+
+def test_normalized_key():
+    assert ResponseCache.make_key('  Python  KYA hai? ', 'formal') == ResponseCache.make_key('python kya hai?', 'formal')
+    assert ResponseCache.make_key('python', 'formal') != ResponseCache.make_key('python', 'casual')
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = ResponseCache(MemoryBackend(max_entries=2))
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 'C'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(MemoryBackend(), ttl=60)
+    cache.set('a', 'A', ttl=-1)
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_sqlite_backend_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = ResponseCache(SQLiteBackend(path, max_entries=2))
+    reader = ResponseCache(SQLiteBackend(path, max_entries=2))
+
+    writer.set('a', 'A')
+    assert reader.get('a') == 'A'
+
+    time.sleep(0.01)
+    writer.set('b', 'B')
+    time.sleep(0.01)
+    writer.set('c', 'C')
+    assert reader.get('a') is None
+    assert reader.get('b') == 'B'
+    assert writer.stats()['evictions'] == 1
+    assert len(reader.backend) == 2
+
+
+def test_sqlite_reopen_keeps_entries(tmp_path):
+    cache = ResponseCache(SQLiteBackend(str(tmp_path / 'cache.sqlite3')))
+    cache.set('a', 'A')
+    inherited = cache.backend._conn
+
+    cache.reopen()
+    assert cache.backend._conn is not inherited
+    assert cache.get('a') == 'A'
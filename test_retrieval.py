@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for character n-gram retrieval over the knowledge base"""
+
+import pytest
+
+import retrieval
+from chatbot_engine import ChatbotEngine
+from knowledge_base import KnowledgeBase
+from retrieval import Retriever, char_ngrams
+
+DOCUMENTS = [
+    ("python programming language", 'python'),
+    ("javascript runs in the browser", 'javascript'),
+    ("database tables and sql queries", 'database'),
+]
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'pure-python'])
+def vectorized(request, monkeypatch):
+    if request.param and not retrieval.NUMPY_AVAILABLE:
+        pytest.skip('numpy is not installed')
+    monkeypatch.setattr(retrieval, 'NUMPY_AVAILABLE', request.param)
+    return request.param
+
+
+def test_char_ngrams_pad_word_edges():
+    grams = char_ngrams('ML ml', sizes=(3,))
+    assert grams == {' ml': 2, 'ml ': 2}
+
+
+def test_search_finds_paraphrases_and_typos(vectorized):
+    retriever = Retriever(DOCUMENTS)
+    assert retriever.vectorized is vectorized
+    assert retriever.search('How do I learn Python?')[0] == 'python'
+    assert retriever.search('pythn programing')[0] == 'python'
+    assert retriever.search('SQL query kaise likhein')[0] == 'database'
+
+
+def test_threshold_rejects_unrelated_messages(vectorized):
+    retriever = Retriever(DOCUMENTS)
+    assert retriever.search('cricket score', threshold=0.3) is None
+    assert retriever.search('', threshold=0.3) is None
+
+
+def test_batch_matches_single_searches(vectorized):
+    retriever = Retriever(DOCUMENTS)
+    messages = ['learn python', 'browser javascript', 'cricket', '', 'sql']
+    batch = retriever.search_batch(messages)
+    for message, hit in zip(messages, batch):
+        single = retriever.search(message)
+        assert (hit is None) == (single is None)
+        if hit:
+            assert hit[0] == single[0]
+            assert hit[1] == pytest.approx(single[1], abs=1e-5)
+
+
+def test_knowledge_base_answers_are_indexed():
+    kb = KnowledgeBase.load()
+    answer, score = kb.retriever.search('frontend developer banne ke liye kya chahiye')
+    assert any('Frontend' in response for response in answer)
+    assert score > 0.3
+
+
+def test_category_keywords_are_indexed():
+    kb = KnowledgeBase.load()
+    answer, _ = kb.retriever.search('pytorch or tensorflow')
+    assert answer in [responses for _, responses in kb.category_topics['ai_ml']]
+    # A topic word still picks the topic
+    answer, _ = kb.retriever.search('neural data')
+    assert answer == kb.categories['ai_ml']['responses']['data science']
+
+
+def test_retrieval_does_not_preempt_keyword_answers():
+    bot = ChatbotEngine()
+
+    # "learning" contains the learn intent word, but the define intent has the topic
+    assert bot._fallback_response('Machine Learning kya hai?').startswith('Machine Learning kya hai?')
+    # A category keyword with none of its topics still gets that category's answers
+    assert bot._fallback_response('react hooks') in bot.kb.category_answers['web_development']
+
+
+def test_engine_answers_unmatched_messages_from_retrieval():
+    bot = ChatbotEngine()
+    bot.provider = None
+    bot.response_cache = None
+    results = bot.get_responses(['Database tables kaise banate hain', 'cricket score'])
+
+    assert results[0]['source'] == 'retrieval'
+    assert 'Database' in results[0]['response']
+    assert results[1]['source'] == 'fallback'
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the preforked production server"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+def post(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status, json.loads(response.read())
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='preforking needs os.fork')
+def test_workers_serve_and_drain_on_sigterm():
+    env = dict(os.environ, CHATBOT_PROVIDER='stub', CHATBOT_STUB_LATENCY_MS='300', CHATBOT_CACHE_BACKEND='memory')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--port', '0', '--workers', '2', '--threads', '2', '--drain-timeout', '5',
+         '--drain-grace', '1'],
+        cwd=HERE, env=env, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        port = re.search(r", (\d+)\)", server.stdout.readline()).group(1)
+        base = f"http://127.0.0.1:{port}"
+
+        pids = {get(base + '/api/ready')[1]['pid'] for _ in range(20)}
+        assert server.pid not in pids
+
+        # A request still running when SIGTERM arrives is allowed to finish
+        result = {}
+        slow = threading.Thread(target=lambda: result.update(zip(('status', 'body'), post(base + '/api/chat', {'message': 'Slow one'}))))
+        slow.start()
+        threading.Event().wait(0.1)
+        server.send_signal(signal.SIGTERM)
+        slow.join(10)
+
+        # During the grace period workers still answer, but report not ready
+        with pytest.raises(urllib.error.HTTPError) as not_ready:
+            get(base + '/api/ready')
+        assert not_ready.value.code == 503
+        assert get(base + '/api/health')[0] == 200
+
+        assert result['status'] == 200
+        assert 'Stub answer' in result['body']['response']
+        assert server.wait(10) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+        server.stdout.close()
+
+
+def test_per_worker_state_is_listed(monkeypatch):
+    import app as app_module
+    from serve import per_worker_state
+
+    state = per_worker_state(app_module)
+    assert any(item.startswith('conversation history') for item in state)
+    assert any(item.startswith('response cache') for item in state)
+
+    monkeypatch.setattr(app_module.chatbot, 'response_cache', None)
+    assert not any(item.startswith('response cache') for item in per_worker_state(app_module))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the bounded session store"""
+
+from session_store import MODEL, USER, SessionStore
+
+
+def test_history_keeps_recent_turns():
+    store = SessionStore(max_turns=4)
+    for i in range(3):
+        store.append('s1', f'question {i}', f'answer {i}')
+
+    assert store.history('s1') == [
+        (USER, 'question 1'), (MODEL, 'answer 1'),
+        (USER, 'question 2'), (MODEL, 'answer 2'),
+    ]
+    assert store.history('unknown') == []
+
+
+def test_token_budget_trims_old_turns():
+    store = SessionStore(max_turns=100, token_budget=30)
+    store.append('s1', 'a' * 40, 'b' * 40)
+    store.append('s1', 'c' * 40, 'd' * 40)
+
+    assert [text[0] for _, text in store.history('s1')] == ['c', 'd']
+
+
+def test_memory_ceiling_evicts_least_recently_used():
+    store = SessionStore(max_bytes=5000)
+    for i in range(10):
+        store.append(f's{i}', 'x' * 200, 'y' * 200)
+        store.history('s0')
+
+    assert store.history('s0')
+    assert store.history('s1') == []
+    assert store.stats()['bytes'] <= 5000
+    assert store.stats()['evictions'] > 0
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(idle_timeout=-1)
+    store.append('s1', 'hello', 'hi')
+    assert store.history('s1') == []
+
+
+def test_invalid_session_ids_are_ignored():
+    store = SessionStore()
+    store.append('x' * 1000, 'hello', 'hi')
+    store.append(42, 'hello', 'hi')
+    assert len(store) == 0
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for coalescing identical in-flight calls"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(pool, flight, key, func, callers):
+    """Start callers once the first one is inside func and wait until all are queued"""
+    started = threading.Event()
+
+    def leader_func():
+        started.set()
+        return func()
+
+    first = pool.submit(flight.do, key, leader_func)
+    started.wait(5)
+    rest = [pool.submit(flight.do, key, leader_func) for _ in range(callers - 1)]
+    while flight.stats()['waiting'] < callers - 1:
+        time.sleep(0.001)
+    return [first] + rest
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = run_concurrently(pool, flight, 'key', slow, callers=8)
+        assert flight.stats()['in_flight'] == 1
+        release.set()
+        assert [future.result() for future in futures] == ['answer'] * 8
+
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'waiting': 0, 'leaders': 1, 'coalesced': 7}
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('model down')
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = run_concurrently(pool, flight, 'key', failing, callers=4)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match='model down'):
+                future.result()
+
+
+def test_finished_calls_are_not_reused():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+    assert flight.stats()['leaders'] == 2
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Tests for the in-memory static asset pipeline"""
+
+import gzip
+import os
+import time
+
+from app import app, static_assets
+from static_assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+PAGE = '<html><link href="site.css"><script src="app.js"></script>' + ' ' * 400 + '</html>'
+SCRIPT = "document.body.innerHTML = '<img src=\"logo.png\">';" + '//' * 300
+
+
+def make_site(root):
+    (root / 'index.html').write_text(PAGE)
+    (root / 'app.js').write_text(SCRIPT)
+    (root / 'site.css').write_text('body { background: url(logo.png); }')
+    (root / 'logo.png').write_bytes(b'\x89PNG' + os.urandom(512))
+    (root / '.env').write_text('SECRET=1')
+    return StaticAssets(str(root), names=('index.html', 'app.js', 'site.css', 'logo.png'))
+
+
+def test_references_point_at_fingerprinted_urls(tmp_path):
+    assets = make_site(tmp_path)
+    _, body, _ = assets.respond('')
+    page = body.decode()
+    assert f'href="{assets.url_for("site.css")}"' in page
+    assert f'src="{assets.url_for("app.js")}"' in page
+
+    _, script, _ = assets.respond(assets.url_for('app.js'))
+    assert assets.url_for('logo.png') in script.decode()
+    _, css, _ = assets.respond(assets.url_for('site.css'))
+    assert f'url({assets.url_for("logo.png")})' in css.decode()
+
+
+def test_compression_and_cache_headers(tmp_path):
+    assets = make_site(tmp_path)
+    url = assets.url_for('app.js')
+
+    status, body, headers = assets.respond(url, 'gzip, deflate')
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Cache-Control'] == IMMUTABLE
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(body).decode().startswith('document.body')
+
+    status, body, headers = assets.respond(url, 'gzip;q=0')
+    assert 'Content-Encoding' not in headers
+    assert body.decode().startswith('document.body')
+
+    # Images are not recompressed
+    _, _, headers = assets.respond(assets.url_for('logo.png'), 'gzip')
+    assert 'Content-Encoding' not in headers and 'Vary' not in headers
+
+    assert assets.respond('app.js')[2]['Cache-Control'] == REVALIDATE
+
+
+def test_etags_revalidate_per_encoding(tmp_path):
+    assets = make_site(tmp_path)
+    _, _, headers = assets.respond('index.html', 'gzip')
+
+    assert assets.respond('index.html', 'gzip', headers['ETag'])[0] == 304
+    assert assets.respond('index.html', 'gzip', 'W/' + headers['ETag'])[0] == 304
+    assert assets.respond('index.html', '', headers['ETag'])[0] == 200
+
+
+def test_only_allow_listed_files_are_served(tmp_path):
+    assets = make_site(tmp_path)
+    assert assets.respond('.env') is None
+    assert assets.respond('../index.html') is None
+
+
+def test_reload_picks_up_changes(tmp_path):
+    assets = make_site(tmp_path)
+    assets.reload = True
+    assets.check_interval = 0
+    old_url = assets.url_for('app.js')
+
+    (tmp_path / 'app.js').write_text(SCRIPT + '// changed')
+    stat = os.stat(tmp_path / 'app.js')
+    os.utime(tmp_path / 'app.js', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    time.sleep(0.01)
+    assets.respond('app.js')
+
+    assert assets.url_for('app.js') != old_url
+    assert assets.respond(old_url) is None
+
+
+def test_app_serves_assets_and_hides_project_files():
+    client = app.test_client()
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert page.status_code == 200
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert static_assets.url_for('script.js') in gzip.decompress(page.data).decode()
+
+    assert client.get('/', headers={'If-None-Match': client.get('/').headers['ETag']}).status_code == 304
+    for path in ('/.env', '/app.py', '/requirements.txt', '/knowledge_base.json'):
+        assert client.get(path).status_code == 404